@@ -7,10 +7,17 @@ import sqlite3
 import threading
 import traceback
 from contextlib import contextmanager
-from typing import Any, Generator, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Generator, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Databasefiler som allerede er satt i WAL-modus. Modusen lagres i filen, så
+# den trenger bare settes én gang per prosess, selv om DatabaseHandler
+# opprettes på nytt ved hver rerun.
+_wal_databaser: Set[str] = set()
+_wal_lock = threading.Lock()
+
 
 class DatabaseHandler:
     """Handler for databaseoperasjoner."""
@@ -19,50 +26,72 @@ class DatabaseHandler:
         self.database_path = database_path
         self._connection_count = 0
         self._lock = threading.Lock()
-        logging.debug(f"DatabaseHandler initialisert med database: {database_path}")
+        logging.debug("DatabaseHandler initialisert med database: %s", database_path)
 
     @contextmanager
-    def connection(self) -> Generator[sqlite3.Connection, None, None]:
-        """Oppretter en ny databasetilkobling for hver forespørsel."""
+    def connection(
+        self, readonly: bool = False
+    ) -> Generator[sqlite3.Connection, None, None]:
+        """Oppretter en ny databasetilkobling for hver forespørsel.
+
+        Med readonly=True åpnes databasen i lesemodus uten transaksjon, slik
+        at lesere i WAL-modus aldri venter på eller blokkerer en skriver.
+        """
         thread_id = threading.get_ident()
 
         with self._lock:
             self._connection_count += 1
             conn_id = self._connection_count
 
-        # Logg full kallstakk for debugging
-        stack = traceback.extract_stack()
-        stack_trace = "".join(traceback.format_list(stack[:-1]))
+        # Logg full kallstakk for debugging. Stakken hentes bare når
+        # debug-logging er på, siden den ellers formateres for hver tilkobling.
+        if logging.root.isEnabledFor(logging.DEBUG):
+            stack = traceback.extract_stack()
+            stack_trace = "".join(traceback.format_list(stack[:-1]))
 
-        log_msg = (
-            f"\n--- Database Connection Debug ---\n"
-            f"[CONN-{conn_id}][Thread-{thread_id}]\n"
-            f"Oppretter tilkobling fra:\n{stack_trace}"
-        )
-        logging.debug(log_msg)
+            log_msg = (
+                f"\n--- Database Connection Debug ---\n"
+                f"[CONN-{conn_id}][Thread-{thread_id}]\n"
+                f"Oppretter tilkobling fra:\n{stack_trace}"
+            )
+            logging.debug(log_msg)
 
         try:
             # Opprett ny tilkobling for hver forespørsel
-            conn = sqlite3.connect(
-                self.database_path, timeout=30.0, isolation_level="IMMEDIATE"
-            )
+            if readonly:
+                conn = sqlite3.connect(
+                    Path(self.database_path).resolve().as_uri() + "?mode=ro",
+                    uri=True,
+                    timeout=30.0,
+                    isolation_level=None,
+                )
+            else:
+                conn = sqlite3.connect(
+                    self.database_path, timeout=30.0, isolation_level="IMMEDIATE"
+                )
             conn.row_factory = sqlite3.Row
 
-            # Konfigurer WAL-modus og andre innstillinger
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA foreign_keys=ON")
+            # Konfigurer WAL-modus og andre innstillinger. journal_mode lagres
+            # i databasefilen og kan ikke settes fra en lesetilkobling.
+            if not readonly:
+                self._aktiver_wal(conn)
+                conn.execute("PRAGMA foreign_keys=ON")
             conn.execute("PRAGMA synchronous=NORMAL")  # Bedre ytelse
             conn.execute("PRAGMA busy_timeout=5000")  # 5 sekunder timeout
             conn.execute("PRAGMA temp_store=MEMORY")  # Bruk minne for temp data
-            conn.execute("PRAGMA cache_size=-2000")  # 2MB cache
+            conn.execute("PRAGMA cache_size=-32768")  # 32MB cache
             conn.execute("PRAGMA mmap_size=268435456")  # 256MB mmap
 
-            logging.debug(f"[CONN-{conn_id}][Thread-{thread_id}] Tilkobling etablert")
+            logging.debug(
+                "[CONN-%s][Thread-%s] Tilkobling etablert", conn_id, thread_id
+            )
 
             try:
                 yield conn
                 conn.commit()
-                logging.debug(f"[CONN-{conn_id}][Thread-{thread_id}] Endringer lagret")
+                logging.debug(
+                    "[CONN-%s][Thread-%s] Endringer lagret", conn_id, thread_id
+                )
             except Exception as e:
                 conn.rollback()
                 error_trace = (
@@ -75,7 +104,9 @@ class DatabaseHandler:
                 raise
             finally:
                 conn.close()
-                logging.debug(f"[CONN-{conn_id}][Thread-{thread_id}] Tilkobling lukket")
+                logging.debug(
+                    "[CONN-%s][Thread-%s] Tilkobling lukket", conn_id, thread_id
+                )
 
         except sqlite3.Error as e:
             error_trace = (
@@ -87,6 +118,15 @@ class DatabaseHandler:
             logging.error(error_trace)
             raise
 
+    def _aktiver_wal(self, conn: sqlite3.Connection) -> None:
+        """Setter databasen i WAL-modus første gang den åpnes i prosessen."""
+        if self.database_path in _wal_databaser:
+            return
+        with _wal_lock:
+            if self.database_path not in _wal_databaser:
+                conn.execute("PRAGMA journal_mode=WAL")
+                _wal_databaser.add(self.database_path)
+
     def execute_query(
         self,
         query: str,
@@ -6,6 +6,7 @@ import logging
 from typing import Optional, Any
 
 from min_kamp.db.errors import DatabaseError
+from min_kamp.db.utils.cache_utils import invalidate_kamp_cache
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,15 @@ class AppHandler:
         self._spiller_handler = None
         self._bytteplan_handler = None
 
+    @property
+    def db_handler(self):
+        """Henter databasehandleren.
+
+        Returns:
+            DatabaseHandler: Instansen handleren ble opprettet med
+        """
+        return self._database_handler
+
     @property
     def auth_handler(self):
         """Henter auth handler.
@@ -108,6 +118,7 @@ class AppHandler:
                     (nokkel, verdi, bruker_id),
                 )
                 conn.commit()
+            invalidate_kamp_cache()
 
         except Exception as e:
             logger.error("Feil ved lagring av innstilling: %s", e)
@@ -161,6 +172,7 @@ class AppHandler:
                     (nokkel, bruker_id),
                 )
                 conn.commit()
+            invalidate_kamp_cache()
 
         except Exception as e:
             logger.error("Feil ved sletting av innstilling: %s", e)
@@ -6,6 +6,10 @@ import logging
 from typing import Any, Dict, Optional, List
 
 from min_kamp.db.errors import DatabaseError
+from min_kamp.db.utils.cache_utils import (
+    invalidate_bytteplan_cache,
+    invalidate_kamp_cache,
+)
 from min_kamp.models.bytteplan_model import Bytteplan, BytteplanDict, Spilletid
 
 logger = logging.getLogger(__name__)
@@ -57,6 +61,7 @@ class BytteplanHandler:
                     (bruker_id, min_spillere, bruker_id, max_spillere),
                 )
                 conn.commit()
+            invalidate_kamp_cache()
 
         except Exception as e:
             logger.error("Feil ved lagring av bytteplan: %s", e)
@@ -125,6 +130,7 @@ class BytteplanHandler:
                     ),
                 )
                 conn.commit()
+                invalidate_bytteplan_cache()
                 return cursor.lastrowid or 0
 
         except Exception as e:
@@ -194,6 +200,7 @@ class BytteplanHandler:
                     (er_paa, bytteplan_id),
                 )
                 conn.commit()
+            invalidate_bytteplan_cache()
 
         except Exception as e:
             logger.error("Feil ved oppdatering av bytteplan: %s", e)
@@ -216,6 +223,7 @@ class BytteplanHandler:
                     (kamp_id,),
                 )
                 conn.commit()
+            invalidate_bytteplan_cache()
 
         except Exception as e:
             logger.error("Feil ved sletting av bytteplan: %s", e)
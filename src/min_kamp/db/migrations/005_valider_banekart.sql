@@ -0,0 +1,36 @@
+-- Valider spillerposisjoner i banekart på databasenivå.
+-- SQLite støtter ikke ALTER TABLE ... ADD CHECK, så kontrollene legges i triggere.
+-- Koordinatene er prosent av spillbart område (0-100).
+CREATE TRIGGER IF NOT EXISTS valider_banekart_insert
+BEFORE INSERT ON banekart
+BEGIN
+    SELECT RAISE(ABORT, 'spillerposisjoner må være gyldig JSON')
+    WHERE NOT json_valid(NEW.spillerposisjoner);
+
+    SELECT RAISE(ABORT, 'spillerposisjoner må ha x og y mellom 0 og 100')
+    WHERE EXISTS (
+        SELECT 1
+        FROM json_each(NEW.spillerposisjoner)
+        WHERE json_extract(value, '$.x') IS NULL
+           OR json_extract(value, '$.y') IS NULL
+           OR CAST(json_extract(value, '$.x') AS REAL) NOT BETWEEN 0 AND 100
+           OR CAST(json_extract(value, '$.y') AS REAL) NOT BETWEEN 0 AND 100
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS valider_banekart_update
+BEFORE UPDATE OF spillerposisjoner ON banekart
+BEGIN
+    SELECT RAISE(ABORT, 'spillerposisjoner må være gyldig JSON')
+    WHERE NOT json_valid(NEW.spillerposisjoner);
+
+    SELECT RAISE(ABORT, 'spillerposisjoner må ha x og y mellom 0 og 100')
+    WHERE EXISTS (
+        SELECT 1
+        FROM json_each(NEW.spillerposisjoner)
+        WHERE json_extract(value, '$.x') IS NULL
+           OR json_extract(value, '$.y') IS NULL
+           OR CAST(json_extract(value, '$.x') AS REAL) NOT BETWEEN 0 AND 100
+           OR CAST(json_extract(value, '$.y') AS REAL) NOT BETWEEN 0 AND 100
+    );
+END;
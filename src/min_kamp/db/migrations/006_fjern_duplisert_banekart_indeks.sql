@@ -0,0 +1,2 @@
+-- idx_banekart_kamp_periode dupliserer primærnøkkelen (kamp_id, periode_id)
+DROP INDEX IF EXISTS idx_banekart_kamp_periode;
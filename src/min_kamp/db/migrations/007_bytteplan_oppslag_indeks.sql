@@ -0,0 +1,4 @@
+-- Indeks for oppslag av forrige status per spiller i en periode, slik at
+-- delspørringen i hent_bytter_for_periode blir ett enkelt B-tre-søk
+CREATE INDEX IF NOT EXISTS idx_bytteplan_oppslag
+ON bytteplan(kamp_id, periode, spiller_id, sist_oppdatert);
@@ -0,0 +1,13 @@
+-- Dekkende indekser for oppslag i app_innstillinger på kamp eller bruker,
+-- slik at verdi kan leses direkte fra indeksen uten oppslag i tabellen
+CREATE INDEX IF NOT EXISTS idx_innstillinger_kamp_nokkel
+ON app_innstillinger(kamp_id, nokkel, verdi);
+
+CREATE INDEX IF NOT EXISTS idx_innstillinger_bruker_nokkel
+ON app_innstillinger(bruker_id, nokkel, verdi);
+
+-- idx_app_innstillinger_bruker_id er et prefiks av den nye bruker-indeksen
+DROP INDEX IF EXISTS idx_app_innstillinger_bruker_id;
+
+-- Oppdater statistikken så spørringsplanleggeren velger de nye indeksene
+ANALYZE app_innstillinger;
@@ -0,0 +1,12 @@
+-- Sammensatte oppslag på kamp er allerede dekket:
+--   kamptropp(kamp_id, spiller_id) av UNIQUE-begrensningen i tabellen
+--   bytteplan(kamp_id, periode, ...) av idx_bytteplan_oppslag
+--   app_innstillinger(kamp_id, nokkel, ...) av idx_innstillinger_kamp_nokkel
+-- Enkeltkolonne-indeksene på kamp_id er prefikser av disse og gir bare
+-- ekstra skrivekostnad.
+DROP INDEX IF EXISTS idx_kamptropp_kamp_id;
+DROP INDEX IF EXISTS idx_bytteplan_kamp_id;
+
+-- Oppdater statistikken så spørringsplanleggeren velger de sammensatte indeksene
+ANALYZE kamptropp;
+ANALYZE bytteplan;
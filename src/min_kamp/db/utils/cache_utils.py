@@ -0,0 +1,187 @@
+"""
+Hurtigbuffere for kampdata som leses ved hver rerun.
+
+Bufrene er st.cache_data og deles av alle økter i prosessen. Alle skrivere
+til app_innstillinger kaller invalidate_kamp_cache, og alle skrivere til
+bytteplan kaller invalidate_bytteplan_cache etter endringer. Levetiden
+fanger bare opp endringer gjort utenfor appen.
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+_SQL_HENT_GRUNNFORMASJON = """
+    SELECT verdi
+    FROM app_innstillinger
+    WHERE kamp_id = ? AND nokkel = 'grunnformasjon'
+    LIMIT 1
+"""
+
+# Henter kampinnstillingene som én rad. Verdier lagret på kampen går
+# foran verdier lagret på brukeren, og nyeste verdi vinner. Mangler en
+# innstilling, eller er verdien ikke et heltall, brukes standardverdien
+# (70 minutter, 7 perioder, 7 spillere). CAST alene ville gjort ugyldig
+# tekst om til 0.
+# Kamp- og brukeroppslaget er skilt i UNION ALL i stedet for OR, og nøklene
+# driver oppslaget fra en VALUES-liste, slik at hver gren blir ett indekssøk
+# per nøkkel.
+_SQL_HENT_INNSTILLINGER = """
+    WITH nokler(nokkel) AS (
+        VALUES ('kamplengde'), ('antall_perioder'), ('antall_paa_banen')
+    ),
+    kandidater AS (
+        SELECT
+            ai.nokkel,
+            CASE
+                WHEN TRIM(ai.verdi) GLOB '[0-9]*'
+                AND TRIM(ai.verdi) NOT GLOB '*[^0-9]*'
+                THEN CAST(TRIM(ai.verdi) AS INTEGER)
+            END AS tall,
+            0 AS prio,
+            ai.sist_oppdatert
+        FROM nokler n
+        JOIN app_innstillinger ai
+        ON ai.kamp_id = :kamp_id AND ai.nokkel = n.nokkel
+        UNION ALL
+        SELECT
+            ai.nokkel,
+            CASE
+                WHEN TRIM(ai.verdi) GLOB '[0-9]*'
+                AND TRIM(ai.verdi) NOT GLOB '*[^0-9]*'
+                THEN CAST(TRIM(ai.verdi) AS INTEGER)
+            END AS tall,
+            1 AS prio,
+            ai.sist_oppdatert
+        FROM nokler n
+        JOIN app_innstillinger ai
+        ON ai.bruker_id = :bruker_id AND ai.nokkel = n.nokkel
+    )
+    SELECT
+        COALESCE(
+            (
+                SELECT tall
+                FROM kandidater
+                WHERE nokkel = 'kamplengde'
+                ORDER BY prio, sist_oppdatert DESC
+                LIMIT 1
+            ),
+            70
+        ) AS kamplengde,
+        COALESCE(
+            (
+                SELECT tall
+                FROM kandidater
+                WHERE nokkel = 'antall_perioder'
+                ORDER BY prio, sist_oppdatert DESC
+                LIMIT 1
+            ),
+            7
+        ) AS antall_perioder,
+        COALESCE(
+            (
+                SELECT tall
+                FROM kandidater
+                WHERE nokkel = 'antall_paa_banen'
+                ORDER BY prio, sist_oppdatert DESC
+                LIMIT 1
+            ),
+            7
+        ) AS antall_paa_banen
+"""
+
+
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def hent_kampinnstillinger_cached(
+    _db_handler: Any, db_sti: str, kamp_id: int, bruker_id: int
+) -> Tuple[int, int, int]:
+    """Henter (kamplengde, antall_perioder, antall_paa_banen) for kampen.
+
+    _db_handler hashes ikke av st.cache_data; db_sti, kamp_id og bruker_id er
+    nøkkelen. Databasefeil caches ikke, men sendes videre til kalleren.
+    """
+    params = {"kamp_id": kamp_id, "bruker_id": bruker_id}
+    with _db_handler.connection(readonly=True) as conn:
+        kamplengde, antall_perioder, antall_paa_banen = conn.execute(
+            _SQL_HENT_INNSTILLINGER, params
+        ).fetchone()
+
+    logger.info(
+        "Kampinnstillinger for kamp %d: lengde=%d, perioder=%d, spillere=%d",
+        kamp_id,
+        kamplengde,
+        antall_perioder,
+        antall_paa_banen,
+    )
+    return kamplengde, antall_perioder, antall_paa_banen
+
+
+@st.cache_data(ttl=60, max_entries=256, show_spinner=False)
+def hent_grunnformasjon_cached(
+    _db_handler: Any, db_sti: str, kamp_id: int
+) -> Optional[str]:
+    """Henter lagret grunnformasjon for kampen, eller None.
+
+    _db_handler hashes ikke av st.cache_data; db_sti og kamp_id er nøkkelen.
+    Databasefeil caches ikke, men sendes videre til kalleren.
+    """
+    with _db_handler.connection(readonly=True) as conn:
+        row = conn.execute(_SQL_HENT_GRUNNFORMASJON, (kamp_id,)).fetchone()
+
+    if row is None:
+        logger.info("Ingen grunnformasjon funnet for kamp %s", kamp_id)
+        return None
+    return row[0]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def hent_bytteplanperioder_cached(
+    _db_handler: Any, db_sti: str, kamp_id: int
+) -> List[Dict[str, Any]]:
+    """Henter periodene i bytteplanen for kampen.
+
+    _db_handler hashes ikke av st.cache_data; db_sti og kamp_id er nøkkelen.
+    Databasefeil caches ikke, men sendes videre til kalleren.
+    """
+    with _db_handler.connection(readonly=True) as conn:
+        cursor = conn.execute(
+            """
+            SELECT DISTINCT periode,
+                   MIN(opprettet_dato) as start_tid,
+                   MAX(sist_oppdatert) as slutt_tid
+            FROM bytteplan
+            WHERE kamp_id = ?
+            GROUP BY periode
+            ORDER BY periode
+        """,
+            (kamp_id,),
+        )
+        perioder = [
+            {
+                "id": periode,
+                "start": start,
+                "slutt": slutt,
+                "beskrivelse": f"Periode {periode + 1}",
+            }
+            for periode, start, slutt in cursor
+        ]
+
+    logger.info("Fant %s perioder for kamp %s", len(perioder), kamp_id)
+    return perioder
+
+
+def invalidate_kamp_cache() -> None:
+    """Tømmer bufrede kampinnstillinger og grunnformasjoner etter endringer.
+
+    st.cache_data tømmes i sin helhet. Hver kamp fylles igjen med ett oppslag.
+    """
+    hent_kampinnstillinger_cached.clear()
+    hent_grunnformasjon_cached.clear()
+
+
+def invalidate_bytteplan_cache() -> None:
+    """Tømmer bufrede bytteplanperioder etter endringer i bytteplan."""
+    hent_bytteplanperioder_cached.clear()
@@ -10,6 +10,10 @@ import streamlit as st
 from min_kamp.db.auth.auth_views import check_auth
 from min_kamp.db.db_handler import DatabaseHandler
 from min_kamp.db.handlers.app_handler import AppHandler
+from min_kamp.db.utils.cache_utils import (
+    invalidate_bytteplan_cache,
+    invalidate_kamp_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -160,7 +164,6 @@ def _lagre_kampinnstillinger(
             'kamplengde', 'antall_perioder', 'antall_paa_banen'
         )
         """
-        db_handler.execute_update(delete_query, (kamp_id,))
 
         # Sett inn nye innstillinger
         query = """
@@ -171,20 +174,22 @@ def _lagre_kampinnstillinger(
             (?, ?, 'antall_perioder', ?),
             (?, ?, 'antall_paa_banen', ?)
         """
-        db_handler.execute_update(
-            query,
-            (
-                kamp_id,
-                bruker_id,
-                str(kamplengde),
-                kamp_id,
-                bruker_id,
-                str(antall_perioder),
-                kamp_id,
-                bruker_id,
-                str(antall_paa_banen),
-            ),
+        params = (
+            kamp_id,
+            bruker_id,
+            str(kamplengde),
+            kamp_id,
+            bruker_id,
+            str(antall_perioder),
+            kamp_id,
+            bruker_id,
+            str(antall_paa_banen),
         )
+
+        # Slett og sett inn i én transaksjon, så innstillingene aldri mangler
+        # mellom de to setningene og WAL bare skrives én gang
+        db_handler.execute_transaction([(delete_query, (kamp_id,)), (query, params)])
+        invalidate_kamp_cache()
         logger.info(
             "Lagret innst for kamp %d: %d, %d, %d",
             kamp_id,
@@ -252,6 +257,7 @@ def _oppdater_bytteplan(
         VALUES (?, ?, ?, ?)
         """
         db_handler.execute_update(insert_query, (kamp_id, spiller_id, periode, er_paa))
+        invalidate_bytteplan_cache()
 
         logger.debug("Oppdatert bytt: s=%d, p=%d, pa=%d", spiller_id, periode, er_paa)
 
@@ -608,7 +614,8 @@ def vis_bytteplan_side(app_handler: AppHandler) -> None:
                 spillere[rad["navn"]] = {
                     "id": rad["spiller_id"],
                     "posisjon": rad["posisjon"],
-                    "perioder": {p: False for p in range(nytt_antall_perioder)},
+                    # Perioder uten rad leses som False via .get()
+                    "perioder": {},
                 }
                 posisjoner[rad["posisjon"]].append(rad["navn"])
             if rad["periode"] is not None:
@@ -7,8 +7,12 @@ Støtter periodevis oversikt over spillerposisjoner og lagring av formasjoner.
 
 import json
 import logging
+import re
+import sqlite3
 import tempfile
-from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, TypedDict, Union
 
 # Gjør pdfkit-importen betinget
 try:
@@ -20,38 +24,677 @@ except ImportError:
     print("pdfkit er ikke installert. PDF-eksport vil ikke være tilgjengelig.")
     print("Installer med: pip install pdfkit")
 
+# Bruk orjson for raskere (de)serialisering av banekart hvis tilgjengelig
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 import streamlit as st
 import streamlit.components.v1 as components
 from min_kamp.db.auth.auth_views import check_auth
 from min_kamp.db.handlers.app_handler import AppHandler
 from min_kamp.db.utils.bytteplan_utils import formater_bytter, hent_bytter
+from min_kamp.db.utils.cache_utils import (
+    hent_bytteplanperioder_cached,
+    hent_grunnformasjon_cached,
+    hent_kampinnstillinger_cached,
+    invalidate_kamp_cache,
+)
 
 logger = logging.getLogger(__name__)
 
-POSISJONER = ["Keeper", "Forsvar", "Midtbane", "Angrep"]
+POSISJONER: Tuple[str, ...] = ("Keeper", "Forsvar", "Midtbane", "Angrep")
+_POSISJON_INDEX: Dict[str, int] = {p: i for i, p in enumerate(POSISJONER)}
 
-try:
-    # Sjekk om wkhtmltopdf er tilgjengelig
-    options = {"quiet": ""}
-    test_html = "<html><body>Test</body></html>"
-    pdfkit.from_string(test_html, None, options=options)
-    HAS_PDFKIT = True
-except ImportError:
-    HAS_PDFKIT = False
-    logger.warning("pdfkit er ikke installert. " "Installer med: pip install pdfkit")
-except OSError:
-    HAS_PDFKIT = False
-    logger.warning(
-        "wkhtmltopdf er ikke installert eller ikke funnet i PATH. "
-        "Installer wkhtmltopdf fra: https://wkhtmltopdf.org/downloads.html"
+
+@lru_cache(maxsize=1)
+def _pdfkit_konfigurasjon() -> Any:
+    """Returnerer én felles pdfkit-konfigurasjon for prosessen.
+
+    Uten eksplisitt konfigurasjon leter pdfkit etter wkhtmltopdf med en ny
+    underprosess for hvert kall til from_string.
+    """
+    return pdfkit.configuration()
+
+
+@lru_cache(maxsize=1)
+def _has_pdfkit() -> bool:
+    """Sjekker om pdfkit og wkhtmltopdf er tilgjengelig.
+
+    Sjekken starter en wkhtmltopdf-prosess, og gjøres derfor først når
+    PDF-eksport faktisk brukes. Resultatet huskes for resten av prosessen.
+    """
+    if not HAS_PDFKIT:
+        logger.warning("pdfkit er ikke installert. Installer med: pip install pdfkit")
+        return False
+    try:
+        options = {"quiet": ""}
+        test_html = "<html><body>Test</body></html>"
+        pdfkit.from_string(
+            test_html, None, options=options, configuration=_pdfkit_konfigurasjon()
+        )
+        return True
+    except OSError:
+        logger.warning(
+            "wkhtmltopdf er ikke installert eller ikke funnet i PATH. "
+            "Installer wkhtmltopdf fra: https://wkhtmltopdf.org/downloads.html"
+        )
+    except Exception as e:
+        logger.warning("Kunne ikke initialisere PDF-støtte: %s", str(e))
+    return False
+
+
+# Lagrer eller oppdaterer banekart i én setning (PRIMARY KEY kamp_id, periode_id)
+_SQL_UPSERT_BANEKART = """
+    INSERT INTO banekart (
+        kamp_id,
+        periode_id,
+        spillerposisjoner,
+        opprettet_dato,
+        sist_oppdatert
+    ) VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(kamp_id, periode_id) DO UPDATE SET
+        spillerposisjoner = excluded.spillerposisjoner,
+        sist_oppdatert = CURRENT_TIMESTAMP
+"""
+
+# Henter endringene i en periode satt sammen i ut/inn-par. Forrige status
+# slås opp med en korrelert delspørring mot idx_bytteplan_oppslag i stedet
+# for LAG(), som må materialisere hele partisjonen. Endringene pares to og
+# to i tidsrekkefølge med LEAD() over det allerede filtrerte settet, så det
+# trengs ingen selvkobling. For en periode uten rader i bytteplan stopper
+# spørringen etter ett søk i idx_bytteplan_oppslag, så det trengs ingen
+# egen EXISTS-sjekk først.
+_SQL_HENT_BYTTER = """
+    WITH endringer AS (
+        SELECT
+            s.navn,
+            b.er_paa,
+            b.sist_oppdatert,
+            ROW_NUMBER() OVER w AS rn,
+            LEAD(s.navn) OVER w AS neste_navn,
+            LEAD(b.er_paa) OVER w AS neste_er_paa
+        FROM bytteplan b
+        JOIN spillere s ON b.spiller_id = s.id
+        WHERE b.kamp_id = ? AND b.periode = ?
+        AND b.er_paa IS NOT (
+            SELECT b2.er_paa
+            FROM bytteplan b2
+            WHERE b2.kamp_id = b.kamp_id
+            AND b2.periode = b.periode
+            AND b2.spiller_id = b.spiller_id
+            AND b2.sist_oppdatert < b.sist_oppdatert
+            ORDER BY b2.sist_oppdatert DESC
+            LIMIT 1
+        )
+        WINDOW w AS (ORDER BY b.sist_oppdatert)
     )
-except Exception as e:
-    HAS_PDFKIT = False
-    logger.warning("Kunne ikke initialisere PDF-støtte: %s", str(e))
+    SELECT
+        CASE
+            WHEN neste_er_paa = 0 THEN neste_navn
+            WHEN er_paa = 0 THEN navn
+        END AS ut,
+        CASE
+            WHEN neste_er_paa = 1 THEN neste_navn
+            WHEN er_paa = 1 THEN navn
+        END AS inn,
+        sist_oppdatert AS tidspunkt
+    FROM endringer
+    WHERE rn % 2 = 1
+    AND ut IS NOT NULL AND ut != ''
+    AND inn IS NOT NULL AND inn != ''
+    ORDER BY rn
+"""
 
-logger = logging.getLogger(__name__)
+# Alle i kamptroppen med siste status i én periode. Med MAX i GROUP BY tar
+# SQLite er_paa fra raden med siste sist_oppdatert. Navnene trimmes for samme
+# whitespace som str.strip() fjerner for vanlig tekst.
+_SQL_SPILLERE_PERIODE = """
+    WITH SisteStatus AS (
+        SELECT
+            spiller_id,
+            er_paa,
+            MAX(sist_oppdatert) as sist_oppdatert
+        FROM bytteplan
+        WHERE kamp_id = ? AND periode = ?
+        GROUP BY spiller_id
+    )
+    SELECT
+        s.id,
+        TRIM(s.navn, char(32, 9, 10, 11, 12, 13)) as navn,
+        COALESCE(ss.er_paa, 0) as er_paa
+    FROM spillere s
+    JOIN kamptropp kt ON s.id = kt.spiller_id AND kt.kamp_id = ?
+    LEFT JOIN SisteStatus ss ON s.id = ss.spiller_id
+    WHERE kt.er_med = 1
+    ORDER BY s.navn
+"""
 
-POSISJONER = ["Keeper", "Forsvar", "Midtbane", "Angrep"]
+# Som _SQL_SPILLERE_PERIODE, men for periode 0 til og med en øvre grense
+_SQL_SPILLERE_PERIODER = """
+    WITH SisteStatus AS (
+        SELECT
+            periode,
+            spiller_id,
+            er_paa,
+            MAX(sist_oppdatert) as sist_oppdatert
+        FROM bytteplan
+        WHERE kamp_id = ? AND periode BETWEEN 0 AND ?
+        GROUP BY periode, spiller_id
+    )
+    SELECT
+        s.id,
+        TRIM(s.navn, char(32, 9, 10, 11, 12, 13)) as navn,
+        ss.periode,
+        ss.er_paa
+    FROM spillere s
+    JOIN kamptropp kt ON s.id = kt.spiller_id AND kt.kamp_id = ?
+    LEFT JOIN SisteStatus ss ON s.id = ss.spiller_id
+    WHERE kt.er_med = 1
+    ORDER BY s.navn
+"""
+
+# Som _SQL_SPILLERE_PERIODE, med navngitte parametre og periode i resultatet
+_SQL_SPILLERE_I_PERIODE = """
+    WITH SisteStatus AS (
+        SELECT
+            spiller_id,
+            er_paa,
+            periode,
+            MAX(sist_oppdatert) as sist_oppdatert
+        FROM bytteplan
+        WHERE kamp_id = :kamp_id AND periode = :periode_id
+        GROUP BY spiller_id
+    )
+    SELECT
+        s.id,
+        TRIM(s.navn, char(32, 9, 10, 11, 12, 13)) as navn,
+        COALESCE(ss.er_paa, 0) as er_paa,
+        ss.periode
+    FROM spillere s
+    JOIN kamptropp kt ON s.id = kt.spiller_id AND kt.kamp_id = :kamp_id
+    LEFT JOIN SisteStatus ss ON s.id = ss.spiller_id
+    WHERE kt.er_med = 1
+    ORDER BY s.navn
+"""
+
+# Stiler for periodeoversikten, sendes med st.markdown ved hver rerun. Ekspanderne
+# har ingen minstehøyde, så lukkede perioder tar bare plass til overskriften;
+# banen i en åpen periode får høyden sin fra components.html.
+_FOTBALLBANE_CSS = """
+<style>
+.stExpander {
+    margin-bottom: 20px !important;
+    overflow: visible !important;
+}
+.streamlit-expanderContent {
+    overflow: visible !important;
+    padding-bottom: 20px !important;
+}
+.streamlit-expanderContent > div {
+    overflow: visible !important;
+}
+.element-container {
+    overflow: visible !important;
+}
+.stMarkdown {
+    overflow: visible !important;
+}
+.spiller {
+    position: absolute;
+    width: 80px;
+    height: 80px;
+    background-color: white;
+    border: 3px solid #1565C0;
+    border-radius: 50%;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    cursor: grab;
+    user-select: none;
+    font-size: 16px;
+    font-weight: bold;
+    z-index: 1000;
+}
+.spiller:hover {
+    transform: scale(1.1);
+    box-shadow: 0 4px 8px rgba(0,0,0,0.3);
+}
+.spiller:active {
+    cursor: grabbing;
+}
+.dragging {
+    opacity: 0.8;
+    transform: scale(1.1);
+    box-shadow: 0 8px 16px rgba(0,0,0,0.4);
+    pointer-events: none;
+}
+.fotballbane {
+    position: relative;
+    overflow: visible !important;
+    touch-action: none;
+    user-select: none;
+    -webkit-user-select: none;
+}
+</style>
+"""
+
+_SCRIPT_RE = re.compile(r"(<script\b.*?</script>)", re.DOTALL | re.IGNORECASE)
+_HTML_KOMMENTAR_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _minifiser_html(html: str) -> str:
+    """Fjerner kommentarer og overflødig whitespace fra HTML.
+
+    Innholdet i <script>-blokker beholder linjeskiftene, siden JS kan ha
+    //-kommentarer, men mister innrykk og tomme linjer.
+    """
+    deler = _SCRIPT_RE.split(html)
+    for i, del_ in enumerate(deler):
+        if i % 2:
+            linjer = (linje.strip() for linje in del_.splitlines())
+            deler[i] = "\n".join(linje for linje in linjer if linje)
+        else:
+            del_ = _HTML_KOMMENTAR_RE.sub("", del_)
+            deler[i] = _WHITESPACE_RE.sub(" ", del_)
+    return "".join(deler).strip()
+
+
+# Mal for fotballbanen. Fylles ut med str.format_map i lag_fotballbane_html;
+# klammeparenteser i CSS/JS er doblet.
+_BANE_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        .fotballbane {{
+            position: relative;
+            overflow: visible !important;
+            touch-action: none;
+            user-select: none;
+            -webkit-user-select: none;
+            background-color: #2e8b57;
+            z-index: 1;
+        }}
+        .spiller {{
+            position: absolute;
+            width: {spiller_diameter}px;
+            height: {spiller_diameter}px;
+            background-color: white;
+            border: 3px solid #1565C0;
+            border-radius: 50%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            cursor: grab;
+            user-select: none;
+            -webkit-user-select: none;
+            touch-action: none;
+            font-size: 16px;
+            font-weight: bold;
+            z-index: 1000;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+        }}
+        .spiller:hover {{
+            transform: scale(1.1);
+            box-shadow: 0 4px 8px rgba(0,0,0,0.3);
+            z-index: 1001;
+        }}
+        .spiller:active {{
+            cursor: grabbing;
+            z-index: 1002;
+        }}
+        .dragging {{
+            opacity: 0.8;
+            transform: scale(1.1);
+            box-shadow: 0 8px 16px rgba(0,0,0,0.4);
+            pointer-events: none;
+            z-index: 1003;
+        }}
+        .nedlasting-knapp {{
+            margin-top: 10px;
+            padding: 8px 16px;
+            background-color: #1565C0;
+            color: white;
+            border: none;
+            border-radius: 4px;
+            cursor: pointer;
+            font-weight: bold;
+        }}
+        .nedlasting-knapp:hover {{
+            background-color: #0D47A1;
+        }}
+    </style>
+    <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
+    <script>
+    function getSpillerPosisjoner() {{
+        const spillere = document.querySelectorAll('.spiller:not(.paa-benken)');
+        const posisjoner = {{}};
+        const bane = document.querySelector('.fotballbane');
+        const baneRect = bane.getBoundingClientRect();
+        const margin = {margin};
+
+        // Beregn det spillbare området
+        const spillbartWidth = baneRect.width - 2 * margin;
+        const spillbartHeight = baneRect.height - 2 * margin;
+
+        spillere.forEach(spiller => {{
+            const rect = spiller.getBoundingClientRect();
+            const spillerId = spiller.getAttribute('data-spiller-id');
+
+            // Beregn senterpunkt for spilleren
+            const spillerSenterX = rect.left + rect.width/2;
+            const spillerSenterY = rect.top + rect.height/2;
+
+            // Beregn relativ posisjon fra banens venstre/topp kant
+            const relativeX = spillerSenterX - baneRect.left - margin;
+            const relativeY = spillerSenterY - baneRect.top - margin;
+
+            // Konverter til prosent av spillbart område
+            const x = (relativeX / spillbartWidth) * 100;
+            const y = (relativeY / spillbartHeight) * 100;
+
+            posisjoner[spillerId] = {{
+                x: Math.max(0, Math.min(100, x)).toFixed(2),
+                y: Math.max(0, Math.min(100, y)).toFixed(2)
+            }};
+        }});
+
+        return posisjoner;
+    }}
+
+    function lagrePosisjoner() {{
+        const posisjoner = getSpillerPosisjoner();
+        const bane = document.querySelector('.fotballbane');
+        const periode_id = bane.getAttribute('data-periode-id');
+
+        console.log('Lagrer posisjoner for periode:', periode_id, 'posisjoner:', posisjoner);
+
+        // Forbered data for sending
+        const data = {{
+            periode_id: periode_id,
+            posisjoner: posisjoner,
+            timestamp: new Date().getTime() // Legg til timestamp for å unngå caching
+        }};
+
+        try {{
+            // Metode 1: Send via Streamlit Component API
+            window.parent.postMessage({{
+                type: 'streamlit:setComponentValue',
+                data: data
+            }}, '*');
+            console.log('Data sendt via Streamlit Component API');
+
+            // Metode 2: Send via URL-parameter (backup)
+            const searchParams = new URLSearchParams(window.parent.location.search);
+            searchParams.set('banekart_data', JSON.stringify(data));
+
+            // Oppdater URL uten å refreshe siden
+            const url = window.parent.location.pathname + '?' + searchParams.toString();
+            window.parent.history.pushState({{}}, '', url);
+            console.log('URL oppdatert med data');
+
+            // Metode 3: Bruk fetch API som ekstra backup
+            fetch(url, {{
+                method: 'GET',
+                headers: {{
+                    'Accept': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                }}
+            }}).then(response => {{
+                console.log('Posisjoner sendt til server via fetch');
+            }}).catch(error => {{
+                console.error('Feil ved sending av posisjoner via fetch:', error);
+            }});
+        }} catch (error) {{
+            console.error('Feil ved lagring av posisjoner:', error);
+        }}
+    }}
+
+    document.addEventListener('DOMContentLoaded', function() {{
+        const spillere = document.querySelectorAll('.spiller');
+        let aktivSpiller = null;
+        let startX = 0;
+        let startY = 0;
+        let offsetX = 0;
+        let offsetY = 0;
+
+        spillere.forEach(spiller => {{
+            spiller.addEventListener('mousedown', startDrag);
+            spiller.addEventListener('touchstart', startDrag);
+        }});
+
+        function startDrag(e) {{
+            if (e.type === 'touchstart') {{
+                // For touch-hendelser, forhindre bare scrolling
+                e.preventDefault();
+            }}
+            aktivSpiller = this;
+            aktivSpiller.classList.add('dragging');
+
+            if (e.type === 'mousedown') {{
+                startX = e.clientX;
+                startY = e.clientY;
+            }} else {{
+                startX = e.touches[0].clientX;
+                startY = e.touches[0].clientY;
+            }}
+
+            const style = window.getComputedStyle(aktivSpiller);
+            offsetX = parseFloat(style.left) || 0;
+            offsetY = parseFloat(style.top) || 0;
+
+            document.addEventListener('mousemove', drag, {{ passive: false }});
+            document.addEventListener('touchmove', drag, {{ passive: false }});
+            document.addEventListener('mouseup', stopDrag);
+            document.addEventListener('touchend', stopDrag);
+        }}
+
+        function drag(e) {{
+            if (!aktivSpiller) return;
+
+            // Forhindre standard berøringshendelser under drag
+            if (e.cancelable) {{
+                e.preventDefault();
+            }}
+
+            let clientX, clientY;
+            if (e.type === 'mousemove') {{
+                clientX = e.clientX;
+                clientY = e.clientY;
+            }} else {{
+                clientX = e.touches[0].clientX;
+                clientY = e.touches[0].clientY;
+            }}
+
+            const dx = clientX - startX;
+            const dy = clientY - startY;
+
+            aktivSpiller.style.left = `${{offsetX + dx}}px`;
+            aktivSpiller.style.top = `${{offsetY + dy}}px`;
+        }}
+
+        function stopDrag() {{
+            if (aktivSpiller) {{
+                aktivSpiller.classList.remove('dragging');
+                aktivSpiller = null;
+                lagrePosisjoner();
+            }}
+
+            document.removeEventListener('mousemove', drag);
+            document.removeEventListener('touchmove', drag);
+            document.removeEventListener('mouseup', stopDrag);
+            document.removeEventListener('touchend', stopDrag);
+        }}
+    }});
+
+    function lastNedSomPNG() {{
+        const bane = document.querySelector('.fotballbane');
+
+        html2canvas(bane, {{
+            backgroundColor: '#2e8b57',
+            scale: 2,
+            logging: true,
+            useCORS: true
+        }}).then(canvas => {{
+            // Konverter canvas til PNG
+            const image = canvas.toDataURL('image/png');
+
+            // Opprett en nedlastingslenke
+            const link = document.createElement('a');
+            link.download = 'fotballbane.png';
+            link.href = image;
+
+            // Legg til lenken i dokumentet
+            document.body.appendChild(link);
+
+            // Klikk på lenken for å starte nedlastingen
+            link.click();
+
+            // Fjern lenken
+            document.body.removeChild(link);
+        }}).catch(error => {{
+            console.error('Feil ved generering av PNG:', error);
+        }});
+    }}
+    </script>
+</head>
+<body>
+    <div class="fotballbane"
+         data-periode-id="{periode_id}"
+         style="width: {width}px; height: {height}px;">
+        {periode_html}
+        {bytter_html}
+        {bane_svg}
+        {spillere_html}
+    </div>
+    <!-- Legg til nedlastingsknapp -->
+    <div style="text-align: center; margin-top: 10px;">
+        <button class="nedlasting-knapp" onclick="lastNedSomPNG()">Last ned som PNG</button>
+    </div>
+</body>
+</html>
+"""
+
+# Minifisert én gang ved import; det er denne som sendes til nettleseren
+_BANE_TEMPLATE_MIN = _minifiser_html(_BANE_TEMPLATE)
+
+# Banens linjer. Avhenger bare av dimensjonene, se _statisk_bane_svg
+_BANE_SVG_TEMPLATE = _minifiser_html(
+    """
+<svg width="{width}" height="{height}">
+    <!-- Ytre ramme -->
+    <rect x="{margin}" y="{margin}"
+          width="{width_minus_margin}" height="{height_minus_margin}"
+          fill="none" stroke="white" stroke-width="2"/>
+
+    <!-- Midtlinje -->
+    <line x1="{margin}" y1="{height_half}"
+          x2="{width_minus_margin}" y2="{height_half}"
+          stroke="white" stroke-width="2"/>
+
+    <!-- Midtsirkel -->
+    <circle cx="{width_half}" cy="{height_half}" r="100"
+            fill="none" stroke="white" stroke-width="2"/>
+
+    <!-- Øvre 16-meter -->
+    <rect x="{sixteen_meter_x}"
+          y="{margin}"
+          width="{sixteen_meter_width}"
+          height="{sixteen_meter_height}"
+          fill="none" stroke="white" stroke-width="2"/>
+
+    <!-- Nedre 16-meter -->
+    <rect x="{sixteen_meter_x}"
+          y="{sixteen_meter_bottom_y}"
+          width="{sixteen_meter_width}"
+          height="{sixteen_meter_height}"
+          fill="none" stroke="white" stroke-width="2"/>
+</svg>
+"""
+)
+
+
+@lru_cache(maxsize=8)
+def _statisk_bane_svg(
+    width: int,
+    height: int,
+    margin: int,
+    sixteen_meter_width: int,
+    sixteen_meter_height: int,
+) -> str:
+    """Returnerer ferdig utfylt SVG med banens linjer for gitte dimensjoner."""
+    return _BANE_SVG_TEMPLATE.format(
+        width=width,
+        height=height,
+        margin=margin,
+        width_minus_margin=width - margin,
+        height_minus_margin=height - 2 * margin,
+        height_half=height / 2,
+        width_half=width / 2,
+        sixteen_meter_x=(width - sixteen_meter_width) / 2,
+        sixteen_meter_width=sixteen_meter_width,
+        sixteen_meter_height=sixteen_meter_height,
+        sixteen_meter_bottom_y=height - margin - sixteen_meter_height,
+    )
+
+
+# Mal for PDF-eksporten, se generer_pdf_html. Minifisert én gang ved import.
+_PDF_TEMPLATE = _minifiser_html(
+    """
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; }}
+        .container {{ padding: 20px; }}
+        .field-container {{ margin: 20px 0; }}
+        table {{ width: 100%; border-collapse: collapse; }}
+        th, td {{ padding: 8px; border: 1px solid #ddd; }}
+        th {{ background-color: #f5f5f5; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>Kampformasjon</h1>
+        <h2>{hjemmelag} vs {bortelag}</h2>
+        <h3>{periode_tekst}</h3>
+
+        <div class="field-container">
+            {fotballbane_html}
+        </div>
+
+        <h3>Spillere på banen</h3>
+        <table>
+            <tr>
+                <th>Navn</th>
+                <th>Posisjon</th>
+            </tr>
+            {spillere_html}
+        </table>
+    </div>
+</body>
+</html>
+"""
+)
+
+
+def _dumps_posisjoner(spillerposisjoner: Dict[str, Any]) -> str:
+    """Serialiserer spillerposisjoner til JSON-tekst for banekart-tabellen."""
+    if HAS_ORJSON:
+        return orjson.dumps(spillerposisjoner).decode()
+    return json.dumps(spillerposisjoner)
+
+
+def _loads_posisjoner(data: Union[str, bytes]) -> Any:
+    """Deserialiserer JSON-tekst fra banekart-tabellen eller URL."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 class SpillerPosisjon(TypedDict):
@@ -63,6 +706,14 @@ class SpillerPosisjon(TypedDict):
     posisjon: Optional[Dict[str, float]]  # x,y koordinater i prosent
 
 
+class Bytte(NamedTuple):
+    """Et bytte i en periode."""
+
+    ut: str
+    inn: str
+    tidspunkt: str
+
+
 def get_spillerposisjon_index(
     spillerposisjoner: Dict[int, str], spiller_id: int, standard_posisjon: str
 ) -> int:
@@ -77,16 +728,18 @@ def get_spillerposisjon_index(
         logger.error("Ugyldig spiller_id type: %s", type(spiller_id))
         raise ValueError("spiller_id må være et heltall")
 
-    if standard_posisjon not in POSISJONER:
+    standard_index = _POSISJON_INDEX.get(standard_posisjon)
+    if standard_index is None:
         logger.error("Ugyldig standard posisjon: %s", standard_posisjon)
-        raise ValueError(f"standard_posisjon må være en av: {POSISJONER}")
+        raise ValueError(f"standard_posisjon må være en av: {list(POSISJONER)}")
 
     posisjon = spillerposisjoner.get(spiller_id, standard_posisjon)
-    if posisjon not in POSISJONER:
+    index = _POSISJON_INDEX.get(posisjon)
+    if index is None:
         logger.error("Ugyldig posisjon funnet: %s", posisjon)
-        return POSISJONER.index(standard_posisjon)
+        return standard_index
 
-    return POSISJONER.index(posisjon)
+    return index
 
 
 def lagre_formasjon(
@@ -113,24 +766,26 @@ def lagre_formasjon(
         logger.error("Ingen posisjoner å lagre")
         return False
 
-    # Valider at alle posisjoner er gyldige
+    # Valider posisjonene og bygg parameterlisten i samme gjennomløp
+    params = []
     for spiller_id, posisjon in posisjoner.items():
-        if posisjon not in POSISJONER:
+        if posisjon not in _POSISJON_INDEX:
             logger.error("Ugyldig posisjon for spiller %s: %s", spiller_id, posisjon)
             return False
+        params.append((posisjon, kamp_id, spiller_id))
 
     try:
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
-            for spiller_id, posisjon in posisjoner.items():
-                cursor.execute(
-                    """
-                    UPDATE kamptropp
-                    SET posisjon = ?
-                    WHERE kamp_id = ? AND spiller_id = ?
-                """,
-                    (posisjon, kamp_id, spiller_id),
-                )
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(
+                """
+                UPDATE kamptropp
+                SET posisjon = ?
+                WHERE kamp_id = ? AND spiller_id = ?
+            """,
+                params,
+            )
             conn.commit()
             logger.info("Formasjon lagret for kamp %s, periode %s", kamp_id, periode_id)
             return True
@@ -151,7 +806,7 @@ def hent_lagret_formasjon(app_handler: AppHandler, kamp_id: int) -> Optional[Dic
         Optional[Dict]: Formasjonsdata hvis funnet
     """
     try:
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection(readonly=True) as conn:
             cursor = conn.cursor()
 
             # Hent formasjon
@@ -182,10 +837,10 @@ def hent_lagret_formasjon(app_handler: AppHandler, kamp_id: int) -> Optional[Dic
                 (kamp_id,),
             )
 
-            posisjoner = {row[0]: row[1] for row in cursor.fetchall()}
+            posisjoner = {spiller_id: posisjon for spiller_id, posisjon in cursor}
 
             return {"formasjon": formasjon, "posisjoner": posisjoner}
-    except Exception as e:
+    except sqlite3.Error as e:
         logger.error("Feil ved henting av formasjon: %s", e)
         return None
 
@@ -208,6 +863,47 @@ def beregn_spiller_posisjon(
     return x_pixels, y_pixels
 
 
+def beregn_spiller_posisjoner(
+    posisjoner: List[Tuple[float, float]], width: int, height: int, margin: int = 50
+) -> List[Tuple[float, float]]:
+    """Beregner pikselposisjoner for alle spillere i ett kall.
+
+    Gir samme resultat som beregn_spiller_posisjon per spiller, men regner ut
+    det spillbare området bare én gang.
+    """
+    spillbart_width = width - 2 * margin
+    spillbart_height = height - 2 * margin
+    return [
+        (
+            margin + (spillbart_width * float(x) / 100),
+            margin + (spillbart_height * float(y) / 100),
+        )
+        for x, y in posisjoner
+    ]
+
+
+def _beregn_bytter_tekst(
+    app_handler: AppHandler, kamp_id: int, periode_id: int
+) -> str:
+    """Beregner bytter-teksten for en periode fra databasen.
+
+    Bygger opp spillernes status per periode på samme måte som oversikten,
+    med ett samlet oppslag for periodene frem til og med periode_id.
+    """
+    spillere: Dict[str, Dict[str, Dict[int, bool]]] = defaultdict(
+        lambda: {"perioder": {}}
+    )
+    rosters = hent_alle_spillere_for_perioder(app_handler, kamp_id, periode_id)
+    for p_id, (paa_banen, paa_benken) in rosters.items():
+        # Listene er disjunkte, så statusen følger av hvilken liste spilleren er i
+        for liste, er_paa in ((paa_banen, True), (paa_benken, False)):
+            for spiller in liste:
+                spillere[spiller["navn"]]["perioder"][p_id] = er_paa
+
+    bytter_inn, bytter_ut = hent_bytter(spillere, periode_id)
+    return formater_bytter(bytter_inn, bytter_ut)
+
+
 def lag_fotballbane_html(
     posisjoner: Optional[List[Tuple[float, float]]] = None,
     spillere_liste: Optional[List[SpillerPosisjon]] = None,
@@ -217,55 +913,57 @@ def lag_fotballbane_html(
     kamp_id: Optional[int] = None,
     periode_id: Optional[int] = None,
     app_handler: Optional[AppHandler] = None,
+    bytter_tekst: Optional[str] = None,
 ) -> str:
-    """Lager HTML for fotballbanen."""
+    """Lager HTML for fotballbanen.
+
+    Hvis bytter_tekst er gitt, brukes den direkte i periodeinfoen. Ellers
+    beregnes byttene fra databasen når kamp_id og app_handler er satt.
+    """
     margin = 50
     sixteen_meter_width = 400
     sixteen_meter_height = 150
     spiller_radius = 40
 
     # Generer HTML for spillerposisjonene
-    spillere_html = ""
+    spillere_html_deler: List[str] = []
     if spillere_liste and posisjoner:
+        gyldige = []
         for spiller, pos in zip(spillere_liste, posisjoner):
             if not isinstance(pos, tuple) or len(pos) != 2:
-                logger.warning(f"Ugyldig posisjon for spiller {spiller['id']}: {pos}")
+                logger.warning(
+                    "Ugyldig posisjon for spiller %s: %s", spiller["id"], pos
+                )
                 continue
+            gyldige.append((spiller, pos))
 
-            x, y = beregn_spiller_posisjon(pos[0], pos[1], width, height, margin)
-            spillere_html += f"""
-            <div class="spiller"
-                 id="spiller_{spiller['id']}"
-                 data-spiller-id="{spiller['id']}"
-                 style="left: {x-spiller_radius}px;
-                        top: {y-spiller_radius}px;">
-                {spiller['navn']}
-            </div>
-            """
+        piksler = beregn_spiller_posisjoner(
+            [pos for _, pos in gyldige], width, height, margin
+        )
+        for (spiller, _), (x, y) in zip(gyldige, piksler):
+            sid = spiller["id"]
+            left = x - spiller_radius
+            top = y - spiller_radius
+            spillere_html_deler.append(
+                f'<div class="spiller" id="spiller_{sid}" data-spiller-id="{sid}" '
+                f'style="left:{left}px;top:{top}px">{spiller["navn"]}</div>'
+            )
+    spillere_html = "".join(spillere_html_deler)
 
     # Generer periode og bytter info HTML
     periode_html = ""
     bytter_html = ""
-    if periode_id is not None and kamp_id is not None and app_handler is not None:
-        # Hent kampinnstillinger
-        _, antall_perioder, _ = _hent_kampinnstillinger(app_handler, kamp_id)
+    if (
+        bytter_tekst is None
+        and periode_id is not None
+        and kamp_id is not None
+        and app_handler is not None
+    ):
+        bytter_tekst = _beregn_bytter_tekst(app_handler, kamp_id, periode_id)
+
+    if periode_id is not None and bytter_tekst is not None:
         periode_nummer = periode_id + 1  # Konverter til 1-basert
 
-        # Bygg opp spillere dictionary på samme måte som i oversikten
-        spillere: dict[str, dict[str, dict[int, bool]]] = {}
-        for p_id in range(periode_id + 1):
-            paa_banen_temp, paa_benken_temp = hent_alle_spillere_for_periode(
-                app_handler, p_id, kamp_id
-            )
-            for spiller in paa_banen_temp + paa_benken_temp:
-                if spiller["navn"] not in spillere:
-                    spillere[spiller["navn"]] = {"perioder": {}}
-                spillere[spiller["navn"]]["perioder"][p_id] = spiller in paa_banen_temp
-
-        # Hent bytter for perioden på samme måte som i oversikten
-        bytter_inn, bytter_ut = hent_bytter(spillere, periode_id)
-        bytter_tekst = formater_bytter(bytter_inn, bytter_ut)
-
         # Lag periode_html med bytter-info
         periode_html = (
             '<div style="position:absolute;top:10px;left:10px;'
@@ -281,338 +979,53 @@ def lag_fotballbane_html(
 
     # Pre-evaluer uttrykk
     spiller_diameter = spiller_radius * 2
-    width_minus_margin = width - margin
-    height_minus_margin = height - 2 * margin
-    height_half = height / 2
-    width_half = width / 2
-    sixteen_meter_x = (width - sixteen_meter_width) / 2
-    sixteen_meter_bottom_y = height - margin - sixteen_meter_height
     periode_id_value = periode_id if periode_id is not None else 0
 
-    html = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                .fotballbane {{
-                    position: relative;
-                    overflow: visible !important;
-                    touch-action: none;
-                    user-select: none;
-                    -webkit-user-select: none;
-                    background-color: #2e8b57;
-                    z-index: 1;
-                }}
-                .spiller {{
-                    position: absolute;
-                    width: {0}px;
-                    height: {0}px;
-                    background-color: white;
-                    border: 3px solid #1565C0;
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    cursor: grab;
-                    user-select: none;
-                    -webkit-user-select: none;
-                    touch-action: none;
-                    font-size: 16px;
-                    font-weight: bold;
-                    z-index: 1000;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.2);
-                }}
-                .spiller:hover {{
-                    transform: scale(1.1);
-                    box-shadow: 0 4px 8px rgba(0,0,0,0.3);
-                    z-index: 1001;
-                }}
-                .spiller:active {{
-                    cursor: grabbing;
-                    z-index: 1002;
-                }}
-                .dragging {{
-                    opacity: 0.8;
-                    transform: scale(1.1);
-                    box-shadow: 0 8px 16px rgba(0,0,0,0.4);
-                    pointer-events: none;
-                    z-index: 1003;
-                }}
-                .nedlasting-knapp {{
-                    margin-top: 10px;
-                    padding: 8px 16px;
-                    background-color: #1565C0;
-                    color: white;
-                    border: none;
-                    border-radius: 4px;
-                    cursor: pointer;
-                    font-weight: bold;
-                }}
-                .nedlasting-knapp:hover {{
-                    background-color: #0D47A1;
-                }}
-            </style>
-            <script src="https://html2canvas.hertzen.com/dist/html2canvas.min.js"></script>
-            <script>
-            function getSpillerPosisjoner() {{
-                const spillere = document.querySelectorAll('.spiller:not(.paa-benken)');
-                const posisjoner = {{}};
-                const bane = document.querySelector('.fotballbane');
-                const baneRect = bane.getBoundingClientRect();
-                const margin = {1};
-
-                // Beregn det spillbare området
-                const spillbartWidth = baneRect.width - 2 * margin;
-                const spillbartHeight = baneRect.height - 2 * margin;
-
-                spillere.forEach(spiller => {{
-                    const rect = spiller.getBoundingClientRect();
-                    const spillerId = spiller.getAttribute('data-spiller-id');
-
-                    // Beregn senterpunkt for spilleren
-                    const spillerSenterX = rect.left + rect.width/2;
-                    const spillerSenterY = rect.top + rect.height/2;
-
-                    // Beregn relativ posisjon fra banens venstre/topp kant
-                    const relativeX = spillerSenterX - baneRect.left - margin;
-                    const relativeY = spillerSenterY - baneRect.top - margin;
-
-                    // Konverter til prosent av spillbart område
-                    const x = (relativeX / spillbartWidth) * 100;
-                    const y = (relativeY / spillbartHeight) * 100;
-
-                    posisjoner[spillerId] = {{
-                        x: Math.max(0, Math.min(100, x)).toFixed(2),
-                        y: Math.max(0, Math.min(100, y)).toFixed(2)
-                    }};
-                }});
-
-                return posisjoner;
-            }}
-
-            function lagrePosisjoner() {{
-                const posisjoner = getSpillerPosisjoner();
-                const bane = document.querySelector('.fotballbane');
-                const periode_id = bane.getAttribute('data-periode-id');
-
-                console.log('Lagrer posisjoner for periode:', periode_id, 'posisjoner:', posisjoner);
-
-                // Forbered data for sending
-                const data = {{
-                    periode_id: periode_id,
-                    posisjoner: posisjoner,
-                    timestamp: new Date().getTime() // Legg til timestamp for å unngå caching
-                }};
-
-                try {{
-                    // Metode 1: Send via Streamlit Component API
-                    window.parent.postMessage({{
-                        type: 'streamlit:setComponentValue',
-                        data: data
-                    }}, '*');
-                    console.log('Data sendt via Streamlit Component API');
-
-                    // Metode 2: Send via URL-parameter (backup)
-                    const searchParams = new URLSearchParams(window.parent.location.search);
-                    searchParams.set('banekart_data', JSON.stringify(data));
-
-                    // Oppdater URL uten å refreshe siden
-                    const url = window.parent.location.pathname + '?' + searchParams.toString();
-                    window.parent.history.pushState({{}}, '', url);
-                    console.log('URL oppdatert med data');
-
-                    // Metode 3: Bruk fetch API som ekstra backup
-                    fetch(url, {{
-                        method: 'GET',
-                        headers: {{
-                            'Accept': 'application/json',
-                            'X-Requested-With': 'XMLHttpRequest'
-                        }}
-                    }}).then(response => {{
-                        console.log('Posisjoner sendt til server via fetch');
-                    }}).catch(error => {{
-                        console.error('Feil ved sending av posisjoner via fetch:', error);
-                    }});
-                }} catch (error) {{
-                    console.error('Feil ved lagring av posisjoner:', error);
-                }}
-            }}
-
-            document.addEventListener('DOMContentLoaded', function() {{
-                const spillere = document.querySelectorAll('.spiller');
-                let aktivSpiller = null;
-                let startX = 0;
-                let startY = 0;
-                let offsetX = 0;
-                let offsetY = 0;
-
-                spillere.forEach(spiller => {{
-                    spiller.addEventListener('mousedown', startDrag);
-                    spiller.addEventListener('touchstart', startDrag);
-                }});
-
-                function startDrag(e) {{
-                    if (e.type === 'touchstart') {{
-                        // For touch-hendelser, forhindre bare scrolling
-                        e.preventDefault();
-                    }}
-                    aktivSpiller = this;
-                    aktivSpiller.classList.add('dragging');
-
-                    if (e.type === 'mousedown') {{
-                        startX = e.clientX;
-                        startY = e.clientY;
-                    }} else {{
-                        startX = e.touches[0].clientX;
-                        startY = e.touches[0].clientY;
-                    }}
-
-                    const style = window.getComputedStyle(aktivSpiller);
-                    offsetX = parseFloat(style.left) || 0;
-                    offsetY = parseFloat(style.top) || 0;
-
-                    document.addEventListener('mousemove', drag, {{ passive: false }});
-                    document.addEventListener('touchmove', drag, {{ passive: false }});
-                    document.addEventListener('mouseup', stopDrag);
-                    document.addEventListener('touchend', stopDrag);
-                }}
-
-                function drag(e) {{
-                    if (!aktivSpiller) return;
-
-                    // Forhindre standard berøringshendelser under drag
-                    if (e.cancelable) {{
-                        e.preventDefault();
-                    }}
-
-                    let clientX, clientY;
-                    if (e.type === 'mousemove') {{
-                        clientX = e.clientX;
-                        clientY = e.clientY;
-                    }} else {{
-                        clientX = e.touches[0].clientX;
-                        clientY = e.touches[0].clientY;
-                    }}
-
-                    const dx = clientX - startX;
-                    const dy = clientY - startY;
+    html = _BANE_TEMPLATE_MIN.format_map(
+        {
+            "spiller_diameter": spiller_diameter,
+            "margin": margin,
+            "periode_id": periode_id_value,
+            "width": width,
+            "height": height,
+            "periode_html": periode_html,
+            "bytter_html": bytter_html,
+            "bane_svg": _statisk_bane_svg(
+                width, height, margin, sixteen_meter_width, sixteen_meter_height
+            ),
+            "spillere_html": spillere_html,
+        }
+    )
+    return html
 
-                    aktivSpiller.style.left = `${{offsetX + dx}}px`;
-                    aktivSpiller.style.top = `${{offsetY + dy}}px`;
-                }}
 
-                function stopDrag() {{
-                    if (aktivSpiller) {{
-                        aktivSpiller.classList.remove('dragging');
-                        aktivSpiller = null;
-                        lagrePosisjoner();
-                    }}
-
-                    document.removeEventListener('mousemove', drag);
-                    document.removeEventListener('touchmove', drag);
-                    document.removeEventListener('mouseup', stopDrag);
-                    document.removeEventListener('touchend', stopDrag);
-                }}
-            }});
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def _lag_fotballbane_html_cached(
+    posisjoner: List[Tuple[float, float]],
+    spillere_liste: List[SpillerPosisjon],
+    periode_id: int,
+    bytter_tekst: str,
+) -> str:
+    """Cachet lag_fotballbane_html for periodeoversikten.
 
-            function lastNedSomPNG() {{
-                const bane = document.querySelector('.fotballbane');
-
-                html2canvas(bane, {{
-                    backgroundColor: '#2e8b57',
-                    scale: 2,
-                    logging: true,
-                    useCORS: true
-                }}).then(canvas => {{
-                    // Konverter canvas til PNG
-                    const image = canvas.toDataURL('image/png');
-
-                    // Opprett en nedlastingslenke
-                    const link = document.createElement('a');
-                    link.download = 'fotballbane.png';
-                    link.href = image;
-
-                    // Legg til lenken i dokumentet
-                    document.body.appendChild(link);
-
-                    // Klikk på lenken for å starte nedlastingen
-                    link.click();
-
-                    // Fjern lenken
-                    document.body.removeChild(link);
-                }}).catch(error => {{
-                    console.error('Feil ved generering av PNG:', error);
-                }});
-            }}
-            </script>
-        </head>
-        <body>
-            <div class="fotballbane"
-                 data-periode-id="{2}"
-                 style="width: {3}px; height: {4}px;">
-                {5}
-                {6}
-                <svg width="{3}" height="{4}">
-                    <!-- Ytre ramme -->
-                    <rect x="{1}" y="{1}"
-                          width="{7}" height="{8}"
-                          fill="none" stroke="white" stroke-width="2"/>
-
-                    <!-- Midtlinje -->
-                    <line x1="{1}" y1="{9}"
-                          x2="{7}" y2="{9}"
-                          stroke="white" stroke-width="2"/>
-
-                    <!-- Midtsirkel -->
-                    <circle cx="{10}" cy="{9}" r="100"
-                            fill="none" stroke="white" stroke-width="2"/>
-
-                    <!-- Øvre 16-meter -->
-                    <rect x="{11}"
-                          y="{1}"
-                          width="{12}"
-                          height="{13}"
-                          fill="none" stroke="white" stroke-width="2"/>
-
-                    <!-- Nedre 16-meter -->
-                    <rect x="{11}"
-                          y="{14}"
-                          width="{12}"
-                          height="{13}"
-                          fill="none" stroke="white" stroke-width="2"/>
-                </svg>
-                {15}
-            </div>
-            <!-- Legg til nedlastingsknapp -->
-            <div style="text-align: center; margin-top: 10px;">
-                <button class="nedlasting-knapp" onclick="lastNedSomPNG()">Last ned som PNG</button>
-            </div>
-        </body>
-        </html>
-    """.format(
-        spiller_diameter,  # 0
-        margin,  # 1
-        periode_id_value,  # 2
-        width,  # 3
-        height,  # 4
-        periode_html,  # 5
-        bytter_html,  # 6
-        width_minus_margin,  # 7
-        height_minus_margin,  # 8
-        height_half,  # 9
-        width_half,  # 10
-        sixteen_meter_x,  # 11
-        sixteen_meter_width,  # 12
-        sixteen_meter_height,  # 13
-        sixteen_meter_bottom_y,  # 14
-        spillere_html,  # 15
+    Alle argumenter inngår i cache-nøkkelen, så HTML bygges bare på nytt
+    når posisjoner, spillere eller bytter for perioden endres. Hver endring
+    gir en ny oppføring, så cachen er begrenset i tid og antall.
+    """
+    return lag_fotballbane_html(
+        posisjoner=posisjoner,
+        spillere_liste=spillere_liste,
+        periode_id=periode_id,
+        bytter_tekst=bytter_tekst,
     )
-    return html
 
 
+@lru_cache(maxsize=1)
 def get_available_formations() -> Dict[str, Dict]:
-    """Returnerer tilgjengelige formasjoner med posisjoner."""
+    """Returnerer tilgjengelige formasjoner med posisjoner.
+
+    Resultatet caches, så kallere må ikke endre det returnerte objektet.
+    """
     return {
         "4-4-2": {
             "forsvar": 4,
@@ -689,8 +1102,26 @@ def get_available_formations() -> Dict[str, Dict]:
     }
 
 
+@lru_cache(maxsize=1)
+def _formasjon_index() -> Dict[str, int]:
+    """Returnerer posisjonen til hver formasjon i get_available_formations."""
+    return {navn: i for i, navn in enumerate(get_available_formations())}
+
+
+@lru_cache(maxsize=1)
+def _formasjon_etiketter() -> Dict[str, str]:
+    """Returnerer visningsetiketter for formasjonsvelgeren, f.eks. '4-4-2 (4-4-2)'."""
+    return {
+        navn: f"{navn} ({f['forsvar']}-{f['midtbane']}-{f['angrep']})"
+        for navn, f in get_available_formations().items()
+    }
+
+
 def hent_bytteplanperioder(app_handler: AppHandler, kamp_id: int) -> List[Dict]:
-    """Henter alle perioder fra bytteplanen."""
+    """Henter alle perioder fra bytteplanen.
+
+    Resultatet caches per database og kamp i 60 sekunder.
+    """
     logger.debug("Henter perioder for kamp %s", kamp_id)
 
     # Valider input
@@ -699,83 +1130,24 @@ def hent_bytteplanperioder(app_handler: AppHandler, kamp_id: int) -> List[Dict]:
         return []
 
     try:
-        with app_handler._database_handler.connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT DISTINCT periode,
-                       MIN(opprettet_dato) as start_tid,
-                       MAX(sist_oppdatert) as slutt_tid
-                FROM bytteplan
-                WHERE kamp_id = ?
-                GROUP BY periode
-                ORDER BY periode
-            """,
-                (kamp_id,),
-            )
-
-            perioder = [
-                {
-                    "id": row[0],  # periode
-                    "start": row[1],
-                    "slutt": row[2],
-                    "beskrivelse": f"Periode {row[0] + 1}",
-                }
-                for row in cursor.fetchall()
-            ]
-
-            logger.info("Fant %s perioder for kamp %s", len(perioder), kamp_id)
-            return perioder
-
+        return hent_bytteplanperioder_cached(
+            app_handler.db_handler, app_handler.db_handler.database_path, kamp_id
+        )
     except Exception as e:
         logger.error("Feil ved henting av bytteplanperioder: %s", e)
         logger.exception("Full feilmelding:")
         return []
 
 
-def hent_spillere_i_periode(conn, periode_id):
-    """Henter alle spillere for en gitt periode."""
-
-    sql = """
-    WITH SisteStatus AS (
-        SELECT
-            spiller_id,
-            er_paa,
-            periode,
-            sist_oppdatert,
-            ROW_NUMBER() OVER (
-                PARTITION BY spiller_id
-                ORDER BY periode DESC, sist_oppdatert DESC
-            ) as rn
-        FROM bytteplan
-        WHERE kamp_id = 16 AND periode = ?
+def hent_spillere_i_periode(conn, periode_id, kamp_id):
+    """Henter alle spillere i kamptroppen for en gitt periode i kampen."""
+    cursor = conn.execute(
+        _SQL_SPILLERE_I_PERIODE, {"kamp_id": kamp_id, "periode_id": periode_id}
     )
-    SELECT
-        s.id,
-        s.navn,
-        COALESCE(ss.er_paa, 0) as er_paa,
-        ss.periode
-    FROM spillere s
-    JOIN kamptropp kt ON s.id = kt.spiller_id AND kt.kamp_id = 16
-    LEFT JOIN SisteStatus ss ON s.id = ss.spiller_id AND ss.rn = 1
-    WHERE kt.er_med = 1
-    ORDER BY s.navn;
-    """
-
-    spillere = []
-    cursor = conn.cursor()
-    cursor.execute(sql, (periode_id,))
-
-    for row in cursor.fetchall():
-        spiller = {
-            "id": row[0],
-            "navn": row[1].strip(),
-            "er_paa": row[2],
-            "periode": row[3],
-        }
-        spillere.append(spiller)
-
-    return spillere
+    return [
+        {"id": spiller_id, "navn": navn, "er_paa": er_paa, "periode": periode}
+        for spiller_id, navn, er_paa, periode in cursor
+    ]
 
 
 def hent_alle_spillere_for_periode(
@@ -785,44 +1157,26 @@ def hent_alle_spillere_for_periode(
     logger.debug("Henter alle spillere for periode %s i kamp %s", periode_id, kamp_id)
 
     try:
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
 
             # Hent alle spillere i kamptroppen med deres siste status
             cursor.execute(
-                """
-                WITH SisteStatus AS (
-                    SELECT
-                        spiller_id,
-                        er_paa,
-                        sist_oppdatert,
-                        ROW_NUMBER() OVER (
-                            PARTITION BY spiller_id
-                            ORDER BY sist_oppdatert DESC
-                        ) as rn
-                    FROM bytteplan
-                    WHERE kamp_id = ? AND periode = ?
-                )
-                SELECT
-                    s.id,
-                    s.navn,
-                    COALESCE(ss.er_paa, 0) as er_paa
-                FROM spillere s
-                JOIN kamptropp kt ON s.id = kt.spiller_id AND kt.kamp_id = ?
-                LEFT JOIN SisteStatus ss ON s.id = ss.spiller_id AND ss.rn = 1
-                WHERE kt.er_med = 1
-                ORDER BY s.navn
-            """,
+                _SQL_SPILLERE_PERIODE,
                 (kamp_id, periode_id, kamp_id),
             )
 
             paa_banen = []
             paa_benken = []
 
-            for row in cursor.fetchall():
-                spiller = {"id": row[0], "navn": row[1].strip(), "posisjon_index": None}
+            for spiller_id, navn, er_paa in cursor:
+                spiller = {
+                    "id": spiller_id,
+                    "navn": navn,
+                    "posisjon_index": None,
+                }
 
-                if row[2]:  # er_paa = 1
+                if er_paa:
                     paa_banen.append(spiller)
                 else:
                     paa_benken.append(spiller)
@@ -850,6 +1204,60 @@ def hent_alle_spillere_for_periode(
         return [], []
 
 
+def hent_alle_spillere_for_perioder(
+    app_handler: AppHandler, kamp_id: int, max_periode: int
+) -> Dict[int, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Henter spillere på banen og på benken for periode 0 til og med max_periode.
+
+    Gir samme resultat som hent_alle_spillere_for_periode for hver periode,
+    men med én spørring i stedet for én per periode.
+    """
+    logger.debug(
+        "Henter alle spillere for periode 0-%s i kamp %s", max_periode, kamp_id
+    )
+
+    try:
+        with app_handler.db_handler.connection() as conn:
+            cursor = conn.cursor()
+
+            # Siste status per periode og spiller, koblet mot kamptroppen
+            cursor.execute(
+                _SQL_SPILLERE_PERIODER,
+                (kamp_id, max_periode, kamp_id),
+            )
+
+            troppen: Dict[int, str] = {}
+            paa_banen_ids: Dict[int, set] = {}
+            for spiller_id, navn, periode, er_paa in cursor:
+                troppen.setdefault(spiller_id, navn)
+                if er_paa:
+                    paa_banen_ids.setdefault(periode, set()).add(spiller_id)
+
+    except Exception as e:
+        logger.error("Feil ved henting av spillere for perioder: %s", e)
+        logger.exception("Full feilmelding:")
+        return {}
+
+    # Nye dicts per periode, slik at kallere kan endre dem uavhengig av hverandre
+    resultat = {}
+    for periode in range(max_periode + 1):
+        ids = paa_banen_ids.get(periode, set())
+        paa_banen = []
+        paa_benken = []
+        for spiller_id, navn in troppen.items():
+            spiller = {"id": spiller_id, "navn": navn, "posisjon_index": None}
+            if spiller_id in ids:
+                paa_banen.append(spiller)
+            else:
+                paa_benken.append(spiller)
+        resultat[periode] = (paa_banen, paa_benken)
+
+    logger.debug(
+        "Fant %d spillere i troppen for %d perioder", len(troppen), len(resultat)
+    )
+    return resultat
+
+
 def generer_pdf_html(
     fotballbane_html: str, spillere: List[Dict], periode: Dict, kamp_info: Dict
 ) -> str:
@@ -862,40 +1270,15 @@ def generer_pdf_html(
         f"<tr><td>{s['navn']}</td><td>{s['posisjon']}</td></tr>" for s in spillere
     )
 
-    return f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; }}
-            .container {{ padding: 20px; }}
-            .field-container {{ margin: 20px 0; }}
-            table {{ width: 100%; border-collapse: collapse; }}
-            th, td {{ padding: 8px; border: 1px solid #ddd; }}
-            th {{ background-color: #f5f5f5; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Kampformasjon</h1>
-            <h2>{kamp_info['hjemmelag']} vs {kamp_info['bortelag']}</h2>
-            <h3>{periode_tekst}</h3>
-
-            <div class="field-container">
-                {fotballbane_html}
-            </div>
-
-            <h3>Spillere på banen</h3>
-            <table>
-                <tr>
-                    <th>Navn</th>
-                    <th>Posisjon</th>
-                </tr>
-                {spillere_html}
-            </table>
-        </div>
-    </body>
-    </html>
-    """
+    return _PDF_TEMPLATE.format_map(
+        {
+            "hjemmelag": kamp_info["hjemmelag"],
+            "bortelag": kamp_info["bortelag"],
+            "periode_tekst": periode_tekst,
+            "fotballbane_html": fotballbane_html,
+            "spillere_html": spillere_html,
+        }
+    )
 
 
 def lag_pdf(
@@ -909,7 +1292,7 @@ def lag_pdf(
     logger.debug("Genererer PDF for kamp %s, periode %s", kamp_id, periode_id)
 
     # Valider input og sjekk avhengigheter
-    if not HAS_PDFKIT:
+    if not _has_pdfkit():
         error_msg = (
             "PDF-generering er ikke tilgjengelig. "
             "Installer wkhtmltopdf fra: https://wkhtmltopdf.org/downloads.html\n"
@@ -933,7 +1316,7 @@ def lag_pdf(
 
     try:
         # Hent kampinfo
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -971,7 +1354,12 @@ def lag_pdf(
         ) as pdf_file:
             logger.debug("Genererer PDF til: %s", pdf_file.name)
             try:
-                pdfkit.from_string(html_content, pdf_file.name, options=options)
+                pdfkit.from_string(
+                    html_content,
+                    pdf_file.name,
+                    options=options,
+                    configuration=_pdfkit_konfigurasjon(),
+                )
                 logger.info("PDF generert for kamp %s, periode %s", kamp_id, periode_id)
                 return pdf_file.name
             except Exception as pdf_error:
@@ -991,16 +1379,19 @@ def lag_pdf(
 def lagre_grunnformasjon(app_handler: AppHandler, kamp_id: int, formasjon: str) -> bool:
     """Lagrer grunnformasjon for kampen og spillerposisjoner i banekartet."""
     try:
-        logger.debug("=== Start lagre_grunnformasjon ===")
-        logger.debug("Parametre: kamp_id=%s, formasjon=%s", kamp_id, formasjon)
+        logger.debug(
+            "=== Start lagre_grunnformasjon === kamp_id=%r, formasjon=%r",
+            kamp_id,
+            formasjon,
+        )
 
         # Valider input
         if not isinstance(kamp_id, int) or kamp_id <= 0:
-            logger.error("Ugyldig kamp_id: %s (type: %s)", kamp_id, type(kamp_id))
+            logger.error("Ugyldig kamp_id: %r", kamp_id)
             return False
 
         if not formasjon or not isinstance(formasjon, str):
-            logger.error("Ugyldig formasjon: %s (type: %s)", formasjon, type(formasjon))
+            logger.error("Ugyldig formasjon: %r", formasjon)
             return False
 
         bruker_id_str = st.query_params.get("bruker_id")
@@ -1017,92 +1408,62 @@ def lagre_grunnformasjon(app_handler: AppHandler, kamp_id: int, formasjon: str)
             logger.error("Ugyldig bruker ID: %s - %s", bruker_id_str, str(e))
             return False
 
-        with app_handler._database_handler.connection() as conn:
+        # Hent posisjoner fra valgt formasjon
+        formations = get_available_formations()
+        if formasjon not in formations:
+            logger.error("Ugyldig formasjon valgt: %s", formasjon)
+            return False
+
+        # Hent spillere som er på banen før vi åpner skrivetilkoblingen,
+        # slik at lesingen ikke konkurrerer med vår egen transaksjon
+        logger.debug("Henter spillere på banen...")
+        paa_banen, _ = hent_alle_spillere_for_periode(app_handler, 0, kamp_id)
+        logger.debug("Fant %d spillere på banen", len(paa_banen))
+
+        posisjoner = formations[formasjon]["posisjoner"]
+        logger.debug(
+            "Hentet %d posisjoner fra formasjon %s", len(posisjoner), formasjon
+        )
+
+        # Lag spillerposisjoner dict
+        spillerposisjoner = {}
+        for spiller, pos in zip(paa_banen, posisjoner):
+            if isinstance(pos, tuple) and len(pos) == 2:
+                spillerposisjoner[str(spiller["id"])] = {
+                    "x": pos[0],
+                    "y": pos[1],
+                }
+        logger.debug("Opprettet spillerposisjoner: %s", spillerposisjoner)
+        posisjoner_json = (
+            _dumps_posisjoner(spillerposisjoner) if spillerposisjoner else None
+        )
+
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
             logger.debug("Database tilkobling opprettet")
 
             try:
+                # Begge skrivingene i én eksplisitt transaksjon, som i lagre_formasjon
+                cursor.execute("BEGIN IMMEDIATE")
+
                 # Lagre formasjonstype i app_innstillinger
                 sql = """
                     INSERT OR REPLACE INTO app_innstillinger
                     (kamp_id, bruker_id, nokkel, verdi)
                     VALUES (?, ?, 'grunnformasjon', ?)
                 """
-                logger.debug("SQL for lagring av grunnformasjon: %s", sql)
-                logger.debug(
-                    "Parametere: kamp_id=%s, bruker_id=%s, formasjon=%s",
-                    kamp_id,
-                    bruker_id,
-                    formasjon,
-                )
-
                 cursor.execute(sql, (kamp_id, bruker_id, formasjon))
                 logger.debug("Grunnformasjon lagret i app_innstillinger")
 
-                # Hent spillere som er på banen
-                logger.debug("Henter spillere på banen...")
-                paa_banen, paa_benken = hent_alle_spillere_for_periode(
-                    app_handler, 0, kamp_id
-                )
-                logger.debug("Fant %d spillere på banen", len(paa_banen))
-                logger.debug("Spillere på banen: %s", paa_banen)
-
-                if not paa_banen:
+                if posisjoner_json is None:
                     logger.warning("Ingen spillere funnet på banen")
-                    return True  # Returnerer True siden grunnformasjon ble lagret
-
-                # Hent posisjoner fra valgt formasjon
-                formations = get_available_formations()
-                if formasjon not in formations:
-                    logger.error("Ugyldig formasjon valgt: %s", formasjon)
-                    return False
-
-                posisjoner = formations[formasjon]["posisjoner"]
-                logger.debug(
-                    "Hentet %d posisjoner fra formasjon %s", len(posisjoner), formasjon
-                )
-                logger.debug("Posisjoner: %s", posisjoner)
-
-                # Lag spillerposisjoner dict
-                spillerposisjoner = {}
-                for spiller, pos in zip(paa_banen, posisjoner):
-                    if isinstance(pos, tuple) and len(pos) == 2:
-                        spillerposisjoner[str(spiller["id"])] = {
-                            "x": pos[0],
-                            "y": pos[1],
-                        }
-                logger.debug("Opprettet spillerposisjoner: %s", spillerposisjoner)
-
-                # Lagre spillerposisjoner i banekart tabellen
-                if spillerposisjoner:
-                    try:
-                        # Slett eksisterende posisjoner
-                        cursor.execute(
-                            "DELETE FROM banekart WHERE kamp_id = ? AND periode_id = 0",
-                            (kamp_id,),
-                        )
-                        logger.debug("Slettet eksisterende posisjoner")
-
-                        # Lagre nye posisjoner
-                        cursor.execute(
-                            """INSERT INTO banekart (
-                                kamp_id,
-                                periode_id,
-                                spillerposisjoner,
-                                opprettet_dato,
-                                sist_oppdatert
-                            ) VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)""",
-                            (kamp_id, 0, json.dumps(spillerposisjoner)),
-                        )
-                        logger.debug("Nye posisjoner lagret i banekart")
-
-                    except Exception as e:
-                        logger.error("Feil ved lagring av banekart: %s", str(e))
-                        logger.error("SQL state: %s", e.__class__.__name__)
-                        conn.rollback()
-                        return False
+                else:
+                    # Lagre eller oppdater posisjoner i banekart tabellen
+                    cursor.execute(_SQL_UPSERT_BANEKART, (kamp_id, 0, posisjoner_json))
+                    logger.debug("Posisjoner lagret i banekart")
 
                 conn.commit()
+                invalidate_kamp_cache()
                 logger.debug("=== Fullført lagre_grunnformasjon ===")
                 return True
 
@@ -1118,39 +1479,63 @@ def lagre_grunnformasjon(app_handler: AppHandler, kamp_id: int, formasjon: str)
         return False
 
 
-def hent_grunnformasjon(app_handler: AppHandler, kamp_id: int) -> Optional[str]:
-    """Henter lagret grunnformasjon for kampen."""
-    logger.debug("Henter grunnformasjon for kamp %s", kamp_id)
+def _les(
+    app_handler: AppHandler, sql: str, params: Union[Tuple[Any, ...], Dict[str, Any]]
+) -> List[sqlite3.Row]:
+    """Kjører en lesespørring på en lesetilkobling og returnerer radene."""
+    with app_handler.db_handler.connection(readonly=True) as conn:
+        return conn.execute(sql, params).fetchall()
 
-    # Valider input
-    if not isinstance(kamp_id, int) or kamp_id <= 0:
-        logger.error("Ugyldig kamp_id: %s", kamp_id)
+
+def hent_grunnformasjon(app_handler: AppHandler, kamp_id: Any) -> Optional[str]:
+    """Henter lagret grunnformasjon for kampen.
+
+    kamp_id kan være en hvilken som helst heltallsliknende verdi (f.eks.
+    numpy-heltall eller tekst fra query params) og normaliseres til int.
+    """
+    # Valider og normaliser input før vi rører databasen
+    try:
+        kamp_id = int(kamp_id)
+    except (TypeError, ValueError):
+        kamp_id = 0
+    if kamp_id <= 0:
+        logger.warning("Ugyldig kamp_id for grunnformasjon")
         return None
 
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Henter grunnformasjon for kamp %s", kamp_id)
+
     try:
-        with app_handler._database_handler.connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT verdi
-                FROM app_innstillinger
-                WHERE kamp_id = ? AND nokkel = 'grunnformasjon'
-            """,
-                (kamp_id,),
-            )
-            row = cursor.fetchone()
+        return hent_grunnformasjon_cached(
+            app_handler.db_handler, app_handler.db_handler.database_path, kamp_id
+        )
+    except sqlite3.Error as e:
+        logger.error("Feil ved henting av grunnformasjon: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full feilmelding:", exc_info=True)
+        return None
 
-            if row:
-                logger.info("Fant grunnformasjon for kamp %s: %s", kamp_id, row[0])
-            else:
-                logger.info("Ingen grunnformasjon funnet for kamp %s", kamp_id)
 
-            return row[0] if row else None
+def _innlogget_bruker_id() -> Optional[int]:
+    """Henter bruker_id fra query params, tolket én gang per sesjon.
 
-    except Exception as e:
-        logger.error("Feil ved henting av grunnformasjon: %s", e)
-        logger.exception("Full feilmelding:")
+    Resultatet lagres i session_state sammen med teksten det ble tolket fra,
+    så en ny bruker_id i URL-en (f.eks. etter utlogging) tolkes på nytt.
+    """
+    bruker_id_str = st.query_params.get("bruker_id")
+    if not bruker_id_str:
+        return None
+
+    cache = st.session_state.get("_bruker_id_cache")
+    if cache is not None and cache[0] == bruker_id_str:
+        return cache[1]
+
+    try:
+        bruker_id = int(bruker_id_str)
+    except (ValueError, TypeError):
         return None
+    st.session_state["_bruker_id_cache"] = (bruker_id_str, bruker_id)
+    return bruker_id
 
 
 def _hent_kampinnstillinger(
@@ -1158,156 +1543,189 @@ def _hent_kampinnstillinger(
 ) -> Tuple[int, int, int]:
     """Henter kampinnstillinger fra databasen."""
     try:
-        bruker_id_str = st.query_params.get("bruker_id")
-        if not bruker_id_str:
-            logger.error("Ingen bruker innlogget")
+        bruker_id = _innlogget_bruker_id()
+        if bruker_id is None:
+            logger.error("Ingen gyldig bruker innlogget")
             return 70, 7, 7
 
-        try:
-            bruker_id = int(bruker_id_str)
-        except (ValueError, TypeError):
-            logger.error("Ugyldig bruker ID")
-            return 70, 7, 7
-
-        with app_handler._database_handler.connection() as conn:
-            cursor = conn.cursor()
-
-            # Hent innstillinger fra databasen med prioritering
-            sql = """
-                SELECT nokkel, verdi
-                FROM app_innstillinger
-                WHERE (bruker_id = ? OR kamp_id = ?)
-                AND nokkel IN (
-                    'kamplengde',
-                    'antall_perioder',
-                    'antall_paa_banen'
-                )
-                ORDER BY
-                    CASE
-                        WHEN kamp_id = ? THEN 1
-                        WHEN bruker_id = ? THEN 2
-                        ELSE 3
-                    END,
-                    sist_oppdatert DESC
-            """
-            cursor.execute(sql, (bruker_id, kamp_id, kamp_id, bruker_id))
-
-            # Definer standard verdier
-            kamplengde = 70  # Standard 70 minutter
-            antall_perioder = 7  # Standard 7 perioder (10 min hver)
-            antall_paa_banen = 7  # Standard 7 spillere på banen
-
-            # Lag en dictionary for å holde styr på innstillinger
-            innstillinger_dict = {}
-
-            # Behandle innstillinger med prioritet
-            for row in cursor.fetchall():
-                nokkel = row[0]
-                verdi = row[1]
-
-                # Kun oppdater hvis nøkkelen ikke allerede er satt
-                if nokkel not in innstillinger_dict:
-                    innstillinger_dict[nokkel] = verdi
-                    logger.debug("Valgt inst: key=%s, val=%s", nokkel, verdi)
-
-            # Oppdater verdier fra databasen
-            if "kamplengde" in innstillinger_dict:
-                kamplengde = int(innstillinger_dict["kamplengde"])
-            if "antall_perioder" in innstillinger_dict:
-                antall_perioder = int(innstillinger_dict["antall_perioder"])
-            if "antall_paa_banen" in innstillinger_dict:
-                antall_paa_banen = int(innstillinger_dict["antall_paa_banen"])
-
-            # Logg innstillingene
-            logger.info(
-                "Kampinnstillinger for kamp %d: " "lengde=%d, perioder=%d, spillere=%d",
-                kamp_id,
-                kamplengde,
-                antall_perioder,
-                antall_paa_banen,
-            )
-            return kamplengde, antall_perioder, antall_paa_banen
+        db_handler = app_handler.db_handler
+        return hent_kampinnstillinger_cached(
+            db_handler, db_handler.database_path, kamp_id, bruker_id
+        )
 
-    except Exception as e:
+    except sqlite3.Error as e:
         logger.error("Feil ved henting av kampinnstillinger: %s", str(e))
-        logger.exception("Full feilmelding:")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full feilmelding:", exc_info=True)
         return 70, 7, 7
 
 
 def hent_bytter_for_periode(
     app_handler: AppHandler, kamp_id: int, periode_id: int
-) -> List[Dict[str, Any]]:
-    """Henter alle bytter for en periode."""
-    try:
-        with app_handler._database_handler.connection() as conn:
-            cursor = conn.cursor()
-
-            # Først hent alle endringer i perioden
-            cursor.execute(
-                """
-                WITH EndringerIPeriode AS (
-                    SELECT
-                        spiller_id,
-                        er_paa,
-                        sist_oppdatert,
-                        LAG(er_paa) OVER (
-                            PARTITION BY spiller_id
-                            ORDER BY sist_oppdatert
-                        ) as forrige_status
-                    FROM bytteplan
-                    WHERE kamp_id = ? AND periode = ?
-                    ORDER BY sist_oppdatert
-                )
-                SELECT
-                    s.navn,
-                    e.er_paa,
-                    e.sist_oppdatert
-                FROM EndringerIPeriode e
-                JOIN spillere s ON e.spiller_id = s.id
-                WHERE (e.er_paa != e.forrige_status OR e.forrige_status IS NULL)
-                ORDER BY e.sist_oppdatert
-            """,
-                (kamp_id, periode_id),
-            )
+) -> List[Bytte]:
+    """Henter alle bytter for en periode.
 
-            endringer = cursor.fetchall()
-            bytter = []
+    Statusendringene i perioden pares to og to i tidsrekkefølge i SQL
+    (_SQL_HENT_BYTTER). Par som ikke består av én spiller ut og én inn tas
+    ikke med.
 
-            # Grupper endringer i inn/ut par
-            for i in range(0, len(endringer), 2):
-                ut = None
-                inn = None
-
-                # Finn ut og inn par
-                for j in range(i, min(i + 2, len(endringer))):
-                    if endringer[j][1] == 0:  # er_paa = 0 (ut)
-                        ut = endringer[j][0]  # navn
-                    elif endringer[j][1] == 1:  # er_paa = 1 (inn)
-                        inn = endringer[j][0]  # navn
-
-                if ut and inn:
-                    bytter.append({"ut": ut, "inn": inn, "tidspunkt": endringer[i][2]})
+    Returns:
+        Liste med Bytte (ut, inn, tidspunkt)
+    """
+    try:
+        rows = _les(app_handler, _SQL_HENT_BYTTER, (kamp_id, periode_id))
+        bytter = [Bytte(*row) for row in rows]
 
+        if logger.isEnabledFor(logging.INFO):
             logger.info(
                 "Fant %d bytter for periode %d i kamp %d",
                 len(bytter),
                 periode_id,
                 kamp_id,
             )
-            return bytter
+        return bytter
 
-    except Exception as e:
+    except sqlite3.Error as e:
         logger.error("Feil ved henting av bytter: %s", e)
         return []
 
 
+@lru_cache(maxsize=16)
+def _lag_perioder(antall_perioder: int) -> Tuple[Dict[str, Any], ...]:
+    """Lager periodelisten for oversikten.
+
+    Listen avhenger bare av antall perioder og deles mellom rerun og økter,
+    så den må ikke endres av kallerne.
+    """
+    return tuple(
+        {
+            "id": i,
+            "start": "Start",
+            "slutt": "Slutt",
+            "beskrivelse": f"Periode {i + 1}",
+        }
+        for i in range(antall_perioder)
+    )
+
+
+def _vis_periode(
+    app_handler: AppHandler,
+    kamp_id: int,
+    periode_id: int,
+    paa_banen: List[Dict[str, Any]],
+    bytter_tekst: str,
+    lagret_banekart: Dict[str, Dict[str, float]],
+    formasjon_index: int,
+    er_aktiv: bool,
+) -> None:
+    """Viser formasjonsvelger, lagreknapp og fotballbane for én periode."""
+    formations = get_available_formations()
+
+    if st.session_state.get("_formasjon_lagret") == periode_id:
+        del st.session_state["_formasjon_lagret"]
+        st.success("Formasjon lagret")
+
+    with st.form(f"formasjon_form_{periode_id}"):
+        col1, col2 = st.columns([3, 1])
+
+        with col1:
+            if bytter_tekst != "-":
+                st.info(f"Bytter denne perioden: {bytter_tekst}")
+
+            selected_formation = st.selectbox(
+                "Velg formasjon for perioden",
+                options=list(formations),
+                key=f"formation_{periode_id}",
+                index=formasjon_index,
+                format_func=_formasjon_etiketter().__getitem__,
+            )
+
+        with col2:
+            # Formasjonen leses først når skjemaet sendes, så valg og lagring
+            # gir én kjøring i stedet for to
+            if st.form_submit_button("Lagre formasjon"):
+                logger.debug("Lagre formasjon knapp trykket for periode %s", periode_id)
+                try:
+                    if lagre_grunnformasjon(app_handler, kamp_id, selected_formation):
+                        logger.info(
+                            "Formasjon lagret for periode %s: %s",
+                            periode_id,
+                            selected_formation,
+                        )
+                        # Grunnformasjonen gjelder alle periodene, og de
+                        # foregående er alt tegnet med den gamle. Kjør derfor
+                        # hele siden på nytt, og vis bekreftelsen etterpå.
+                        st.session_state["_formasjon_lagret"] = periode_id
+                        st.rerun()
+                    else:
+                        logger.error(
+                            "Kunne ikke lagre formasjon for periode %s", periode_id
+                        )
+                        st.error("Kunne ikke lagre formasjon")
+                except Exception as e:
+                    logger.error(
+                        "Feil ved lagring av formasjon for periode %s: %s",
+                        periode_id,
+                        str(e),
+                    )
+                    logger.exception("Full feilmelding:")
+                    st.error("Kunne ikke lagre formasjon")
+
+    if not selected_formation:
+        return
+
+    # Ingen spillere å plassere - hopp over banekart og fotballbane
+    if not paa_banen:
+        st.info("Ingen spillere på banen i denne perioden")
+        return
+
+    # Vis fotballbanen med spillere (kopi, siden listen endres under)
+    posisjoner = list(formations[selected_formation]["posisjoner"])
+    logger.debug("Hentet lagret banekart: %s", lagret_banekart)
+
+    # Konverter spillere til SpillerPosisjon format
+    spillere_paa_banen: List[SpillerPosisjon] = [
+        {
+            "id": spiller["id"],
+            "navn": spiller["navn"],
+            "posisjon_index": None,
+            "posisjon": None,
+        }
+        for spiller in paa_banen
+    ]
+
+    # Bruk lagrede posisjoner der de finnes, ellers standardposisjon
+    if lagret_banekart:
+        for i, spiller_posisjon in enumerate(spillere_paa_banen):
+            pos = lagret_banekart.get(str(spiller_posisjon["id"]))
+            if pos:
+                spiller_posisjon["posisjon"] = pos
+                posisjoner[i] = (float(pos["x"]), float(pos["y"]))
+
+    fotballbane = _lag_fotballbane_html_cached(
+        posisjoner=posisjoner,
+        spillere_liste=spillere_paa_banen,
+        periode_id=periode_id,
+        bytter_tekst=bytter_tekst,
+    )
+
+    # Oppdater URL med aktiv periode når fotballbane vises
+    if er_aktiv:
+        st.query_params["periode_id"] = str(periode_id)
+
+    components.html(fotballbane, height=1100)
+
+
 def vis_periodevis_oversikt(app_handler: AppHandler, kamp_id: int) -> None:
     """Viser oversikt over formasjoner per periode."""
     # Hent kampinnstillinger først
     _, antall_perioder, _ = _hent_kampinnstillinger(app_handler, kamp_id)
 
+    # Les query params én gang i stedet for gjentatte oppslag via proxyen
+    qp = st.query_params.to_dict()
+
     # Sett aktiv periode fra URL eller bruk 0 som standard
-    aktiv_periode_str = st.query_params.get("periode_id", "0")
+    aktiv_periode_str = qp.get("periode_id", "0")
     try:
         aktiv_periode = int(aktiv_periode_str)
     except ValueError:
@@ -1315,16 +1733,7 @@ def vis_periodevis_oversikt(app_handler: AppHandler, kamp_id: int) -> None:
 
     logger.debug("Aktiv periode: %d", aktiv_periode)
 
-    perioder = []
-    for i in range(antall_perioder):
-        perioder.append(
-            {
-                "id": i,
-                "start": "Start",
-                "slutt": "Slutt",
-                "beskrivelse": f"Periode {i + 1}",
-            }
-        )
+    perioder = _lag_perioder(antall_perioder)
 
     if not perioder:
         st.warning("Ingen perioder funnet i bytteplanen. Opprett bytteplan først.")
@@ -1336,261 +1745,96 @@ def vis_periodevis_oversikt(app_handler: AppHandler, kamp_id: int) -> None:
     # Hent grunnformasjon som standard
     grunnformasjon = hent_grunnformasjon(app_handler, kamp_id)
 
-    # Hent tilgjengelige formasjoner
-    formations = get_available_formations()
+    # Finn index for grunnformasjon, ukjente formasjoner gir første valg
+    formasjon_index = _formasjon_index().get(grunnformasjon, 0)
 
-    # Container for alle perioder
-    st.markdown(
-        """
-        <style>
-        .stExpander {
-            min-height: 800px !important;
-            margin-bottom: 20px !important;
-            overflow: visible !important;
-        }
-        .streamlit-expanderContent {
-            min-height: 800px !important;
-            overflow: visible !important;
-            padding-bottom: 20px !important;
-        }
-        .streamlit-expanderContent > div {
-            min-height: 800px !important;
-            overflow: visible !important;
-        }
-        .element-container {
-            overflow: visible !important;
-        }
-        .stMarkdown {
-            overflow: visible !important;
-        }
-        .spiller {
-            position: absolute;
-            width: 80px;
-            height: 80px;
-            background-color: white;
-            border: 3px solid #1565C0;
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            cursor: grab;
-            user-select: none;
-            font-size: 16px;
-            font-weight: bold;
-            z-index: 1000;
-        }
-        .spiller:hover {
-            transform: scale(1.1);
-            box-shadow: 0 4px 8px rgba(0,0,0,0.3);
-        }
-        .spiller:active {
-            cursor: grabbing;
-        }
-        .dragging {
-            opacity: 0.8;
-            transform: scale(1.1);
-            box-shadow: 0 8px 16px rgba(0,0,0,0.4);
-            pointer-events: none;
-        }
-        .fotballbane {
-            position: relative;
-            overflow: visible !important;
-            touch-action: none;
-            user-select: none;
-            -webkit-user-select: none;
-        }
-        </style>
-    """,
-        unsafe_allow_html=True,
-    )
+    # Hent lagrede banekart for alle perioder i én spørring
+    alle_banekart = hent_alle_banekart(app_handler, kamp_id)
 
-    # Hent alle spillere og deres status for alle perioder først
-    spillere = {}
-    for periode in perioder:
-        paa_banen, paa_benken = hent_alle_spillere_for_periode(
-            app_handler, periode["id"], kamp_id
-        )
+    # Sjekk om vi har mottatt posisjonsdata fra URL. Parameteren fjernes
+    # etter første forsøk uansett utfall, så den ikke parses på nytt.
+    banekart_data_str = qp.get("banekart_data")
+    if banekart_data_str:
+        st.query_params.pop("banekart_data", None)
+        try:
+            banekart_data = _loads_posisjoner(banekart_data_str)
+            logger.debug("Mottok data fra URL: %s", banekart_data)
+
+            if isinstance(banekart_data, dict):
+                try:
+                    url_periode_id = int(banekart_data.get("periode_id", 0))
+                    url_posisjoner = banekart_data.get("posisjoner", {})
+                    logger.debug("Posisjoner fra URL: %s", url_posisjoner)
+
+                    if url_posisjoner:
+                        success = lagre_banekart(
+                            app_handler, kamp_id, url_periode_id, url_posisjoner
+                        )
+                        if success:
+                            alle_banekart[url_periode_id] = url_posisjoner
+                            st.success("Posisjoner lagret")
+                            # Fjernet st.rerun() - direkte DB-skriving, hindrer flimring
+                        else:
+                            st.error("Kunne ikke lagre posisjoner")
+                    else:
+                        st.warning("Ingen posisjoner å lagre")
+                except ValueError as e:
+                    logger.error("Ugyldig periode_id: %s", str(e))
+                    st.error("Ugyldig periode ID")
+        except json.JSONDecodeError as e:
+            logger.error("Ugyldig JSON data: %s", str(e))
+            st.error("Ugyldig data mottatt")
+        except Exception as e:
+            logger.error("Feil ved håndtering av banekart data: %s", str(e))
+            st.error("Kunne ikke håndtere banekart data")
 
-        # Oppdater spillerdata med status for denne perioden
-        for spiller in paa_banen + paa_benken:
-            if spiller["navn"] not in spillere:
-                spillere[spiller["navn"]] = {"perioder": {}}
-            spillere[spiller["navn"]]["perioder"][periode["id"]] = spiller in paa_banen
+    # Container for alle perioder
+    st.markdown(_FOTBALLBANE_CSS, unsafe_allow_html=True)
 
-    # Debug logging
-    logger.debug("Komplett spillerdata for alle perioder: %s", spillere)
+    # Hent alle spillere og deres status for alle perioder i én spørring
+    spillere: Dict[str, Dict[str, Dict[int, bool]]] = defaultdict(
+        lambda: {"perioder": {}}
+    )
+    period_rosters = hent_alle_spillere_for_perioder(
+        app_handler, kamp_id, perioder[-1]["id"]
+    )
 
     for periode in perioder:
         periode_tekst = (
             f"Periode {periode['id'] + 1} " f"({periode['start']} - {periode['slutt']})"
         )
-        with st.expander(periode_tekst, expanded=True):
-            col1, col2 = st.columns([3, 1])
-
-            with col1:
-                # Hent spillere for perioden
-                periode_id = periode["id"]
-                paa_banen, paa_benken = hent_alle_spillere_for_periode(
-                    app_handler, periode_id, kamp_id
-                )
-
-                if not paa_banen and not paa_benken:
-                    st.info("Ingen spillere funnet for denne perioden")
-                    continue
-
-                # Hent og vis bytter for perioden
-                bytter_inn, bytter_ut = hent_bytter(spillere, periode_id)
-                bytter_tekst = formater_bytter(bytter_inn, bytter_ut)
-                if bytter_tekst != "-":
-                    st.info(f"Bytter denne perioden: {bytter_tekst}")
-
-                # Finn index for grunnformasjon
-                formasjon_index = 0
-                if grunnformasjon:
-                    form_keys = list(formations.keys())
-                    formasjon_index = form_keys.index(grunnformasjon)
-
-                # Lag format funksjon for formasjon selectbox
-                def format_formasjon(x: str) -> str:
-                    return (
-                        f"{x} ({formations[x]['forsvar']}-"
-                        f"{formations[x]['midtbane']}-"
-                        f"{formations[x]['angrep']})"
-                    )
-
-                selected_formation = st.selectbox(
-                    "Velg formasjon for perioden",
-                    options=list(formations.keys()),
-                    key=f"formation_{periode['id']}",
-                    index=formasjon_index,
-                    format_func=format_formasjon,
-                )
-
-            with col2:
-                # Legg til lagre-knapp for hver periode
-                if st.button("Lagre formasjon", key=f"lagre_{periode['id']}"):
-                    logger.debug(
-                        "Lagre formasjon knapp trykket for periode %s", periode["id"]
-                    )
-                    try:
-                        if lagre_grunnformasjon(
-                            app_handler, kamp_id, selected_formation
-                        ):
-                            logger.info(
-                                "Formasjon lagret for periode %s: %s",
-                                periode["id"],
-                                selected_formation,
-                            )
-                            st.success("Formasjon lagret")
-                            logger.debug("Lagring ok, ingen rerun (unngår flimring)")
-                            # Fjernet st.rerun() for å unngå flimring
-                        else:
-                            logger.error(
-                                "Kunne ikke lagre formasjon for periode %s",
-                                periode["id"],
-                            )
-                            st.error("Kunne ikke lagre formasjon")
-                    except Exception as e:
-                        logger.error(
-                            "Feil ved lagring av formasjon for periode %s: %s",
-                            periode["id"],
-                            str(e),
-                        )
-                        logger.exception("Full feilmelding:")
-                        st.error("Kunne ikke lagre formasjon")
-
-            if selected_formation:
-                # Sjekk om vi har mottatt posisjonsdata fra URL
-                banekart_data_str = st.query_params.get("banekart_data")
-                if banekart_data_str:
-                    try:
-                        banekart_data = json.loads(banekart_data_str)
-                        logger.debug("Mottok data fra URL: %s", banekart_data)
-
-                        if isinstance(banekart_data, dict):
-                            try:
-                                periode_id = int(banekart_data.get("periode_id", 0))
-                                posisjoner = banekart_data.get("posisjoner", {})
-                                logger.debug("Posisjoner fra URL: %s", posisjoner)
-
-                                if posisjoner:
-                                    success = lagre_banekart(
-                                        app_handler, kamp_id, periode_id, posisjoner
-                                    )
-                                    if success:
-                                        st.success("Posisjoner lagret")
-                                        # Fjern data fra URL
-                                        st.query_params.pop("banekart_data", None)
-                                        # Fjernet st.rerun() - direkte DB-skriving, hindrer flimring
-                                    else:
-                                        st.error("Kunne ikke lagre posisjoner")
-                                else:
-                                    st.warning("Ingen posisjoner å lagre")
-                            except ValueError as e:
-                                logger.error("Ugyldig periode_id: %s", str(e))
-                                st.error("Ugyldig periode ID")
-                    except json.JSONDecodeError as e:
-                        logger.error("Ugyldig JSON data: %s", str(e))
-                        st.error("Ugyldig data mottatt")
-                    except Exception as e:
-                        logger.error("Feil ved håndtering av banekart data: %s", str(e))
-                        st.error("Kunne ikke håndtere banekart data")
-
-                # Vis fotballbanen med spillere
-                posisjoner = formations[selected_formation]["posisjoner"]
-
-                # Hent lagret banekart hvis det finnes
-                lagret_banekart = hent_banekart(app_handler, kamp_id, periode_id)
-                logger.debug("Hentet lagret banekart: %s", lagret_banekart)
-
-                # Konverter spillere til SpillerPosisjon format og sett posisjoner
-                spillere_paa_banen: List[SpillerPosisjon] = []
-                brukte_posisjoner = 0
-
-                for spiller in paa_banen:
-                    spiller_posisjon: SpillerPosisjon = {
-                        "id": spiller["id"],
-                        "navn": spiller["navn"],
-                        "posisjon_index": None,
-                        "posisjon": None,
-                    }
-
-                    # Hvis vi har lagret banekart, bruk de lagrede posisjonene
-                    if lagret_banekart and str(spiller["id"]) in lagret_banekart:
-                        pos = lagret_banekart[str(spiller["id"])]
-                        logger.debug(
-                            "Bruker lagret posisjon for spiller %s: %s",
-                            spiller["id"],
-                            pos,
-                        )
-                        spiller_posisjon["posisjon"] = pos
-                        x_percent = float(pos["x"])
-                        y_percent = float(pos["y"])
-                        posisjoner[brukte_posisjoner] = (x_percent, y_percent)
-                    else:
-                        logger.debug(
-                            "Bruker standardposisjon %d for spiller %s",
-                            brukte_posisjoner,
-                            spiller["id"],
-                        )
-
-                    brukte_posisjoner += 1
-                    spillere_paa_banen.append(spiller_posisjon)
-
-                fotballbane = lag_fotballbane_html(
-                    posisjoner=posisjoner,
-                    spillere_liste=spillere_paa_banen,
-                    spillere_paa_benken=paa_benken,
-                    kamp_id=kamp_id,
-                    periode_id=periode_id,
-                    app_handler=app_handler,
-                )
+        periode_id = periode["id"]
+        # Bare aktiv periode er åpen ved innlasting, så nettleseren slipper å
+        # legge ut og tegne banekartet for hver periode samtidig
+        with st.expander(periode_tekst, expanded=periode_id == aktiv_periode):
+            # Hent spillere for perioden
+            paa_banen, paa_benken = period_rosters.get(periode_id, ([], []))
+
+            # Oppdater spillerdata med status for denne perioden. Periodene
+            # gås gjennom i stigende rekkefølge, så forrige periode er alltid
+            # på plass når byttene beregnes under. Listene er disjunkte, så
+            # statusen følger av hvilken liste spilleren er i.
+            for liste, er_paa in ((paa_banen, True), (paa_benken, False)):
+                for spiller in liste:
+                    spillere[spiller["navn"]]["perioder"][periode_id] = er_paa
+
+            if not paa_banen and not paa_benken:
+                st.info("Ingen spillere funnet for denne perioden")
+                continue
 
-                # Oppdater URL med aktiv periode når fotballbane vises
-                if periode["id"] == aktiv_periode:
-                    st.query_params["periode_id"] = str(periode_id)
+            # Hent bytter for perioden
+            bytter_inn, bytter_ut = hent_bytter(spillere, periode_id)
 
-                components.html(fotballbane, height=1100)
+            _vis_periode(
+                app_handler,
+                kamp_id,
+                periode_id,
+                paa_banen,
+                formater_bytter(bytter_inn, bytter_ut),
+                alle_banekart.get(periode_id) or {},
+                formasjon_index,
+                periode_id == aktiv_periode,
+            )
 
 
 def sett_opp_startoppstilling(app_handler: AppHandler, kamp_id: int) -> bool:
@@ -1599,7 +1843,7 @@ def sett_opp_startoppstilling(app_handler: AppHandler, kamp_id: int) -> bool:
     i kamptroppen.
     """
     try:
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
 
             # Hent de første 11 spillerne fra kamptroppen
@@ -1631,15 +1875,14 @@ def sett_opp_startoppstilling(app_handler: AppHandler, kamp_id: int) -> bool:
             )
 
             # Sett opp startoppstillingen
-            for spiller_id, navn in spillere:
-                cursor.execute(
-                    """
-                    INSERT INTO spillere_i_periode (
-                        kamp_id, periode_id, spiller_id, er_paa, sist_oppdatert
-                    ) VALUES (?, 0, ?, 1, CURRENT_TIMESTAMP)
-                """,
-                    (kamp_id, spiller_id),
-                )
+            cursor.executemany(
+                """
+                INSERT INTO spillere_i_periode (
+                    kamp_id, periode_id, spiller_id, er_paa, sist_oppdatert
+                ) VALUES (?, 0, ?, 1, CURRENT_TIMESTAMP)
+            """,
+                [(kamp_id, spiller_id) for spiller_id, _ in spillere],
+            )
 
             conn.commit()
             logger.info("Startoppstilling satt opp for kamp %s", kamp_id)
@@ -1671,8 +1914,11 @@ def vis_formasjon_side(app_handler: AppHandler) -> None:
         logger.debug("=== Start vis_formasjon_side ===")
         logger.debug("Sjekker query params og bruker...")
 
+        # Les query params én gang i stedet for gjentatte oppslag via proxyen
+        qp = st.query_params.to_dict()
+
         # Hent kamp_id fra query params
-        kamp_id_str = st.query_params.get("kamp_id")
+        kamp_id_str = qp.get("kamp_id")
         logger.debug("Hentet kamp_id fra query params: %s", kamp_id_str)
 
         if not kamp_id_str:
@@ -1760,11 +2006,13 @@ def vis_formasjon_side(app_handler: AppHandler) -> None:
                 if "component_value" in st.session_state:
                     del st.session_state["component_value"]
 
-        # Håndter banekart data fra URL (for bakoverkompatibilitet)
-        banekart_data_str = st.query_params.get("banekart_data")
+        # Håndter banekart data fra URL (for bakoverkompatibilitet). Parameteren
+        # fjernes før parsing, så den ikke behandles på nytt uansett utfall.
+        banekart_data_str = qp.get("banekart_data")
         if banekart_data_str:
+            st.query_params.pop("banekart_data", None)
             try:
-                banekart_data = json.loads(banekart_data_str)
+                banekart_data = _loads_posisjoner(banekart_data_str)
                 logger.debug("Mottok data fra URL: %s", banekart_data)
 
                 if isinstance(banekart_data, dict):
@@ -1779,27 +2027,17 @@ def vis_formasjon_side(app_handler: AppHandler) -> None:
                             )
                             if success:
                                 logger.info("Posisjoner lagret fra URL")
-                                # Fjern data fra URL for å unngå gjentatt lagring
-                                st.query_params.pop("banekart_data", None)
                                 # Ikke vis success-melding for å unngå flimring
                             else:
                                 logger.error("Kunne ikke lagre posisjoner fra URL")
                                 st.error("Kunne ikke lagre posisjoner")
-                                # Fjern data fra URL for å unngå gjentatt forsøk
-                                st.query_params.pop("banekart_data", None)
                         else:
                             logger.warning("Ingen posisjoner å lagre fra URL")
-                            # Fjern data fra URL for å unngå gjentatt forsøk
-                            st.query_params.pop("banekart_data", None)
                     except ValueError as e:
                         logger.error("Ugyldig periode_id fra URL: %s", str(e))
-                        # Fjern data fra URL for å unngå gjentatt feil
-                        st.query_params.pop("banekart_data", None)
             except Exception as e:
                 logger.error("Feil ved håndtering av banekart data fra URL: %s", str(e))
                 logger.exception("Full feilmelding:")
-                # Fjern data fra URL for å unngå gjentatt feil
-                st.query_params.pop("banekart_data", None)
 
         # Hent tilgjengelige formasjoner
         try:
@@ -1817,9 +2055,7 @@ def vis_formasjon_side(app_handler: AppHandler) -> None:
         logger.debug("Hentet lagret formasjon: %s", lagret_formasjon)
 
         # Finn index for lagret formasjon
-        formasjon_index = (
-            list(formations.keys()).index(lagret_formasjon) if lagret_formasjon else 0
-        )
+        formasjon_index = _formasjon_index().get(lagret_formasjon, 0)
         logger.debug("Bruker formasjon index: %d", formasjon_index)
 
         # Vis formasjonsvelger
@@ -1903,23 +2139,108 @@ def vis_formation_page(app_handler: AppHandler):
         st.error(f"En feil oppstod ved visning av formasjon: {str(e)}")
 
 
+def valider_spillerposisjoner(spillerposisjoner: Any) -> bool:
+    """Validerer spillerposisjoner før lagring i banekart.
+
+    Gir detaljerte feilmeldinger i loggen. Databasen avviser i tillegg
+    ugyldige data via triggere på banekart-tabellen.
+
+    Args:
+        spillerposisjoner: Dict med spiller_id -> {"x": ..., "y": ...}
+
+    Returns:
+        bool: True hvis alle posisjoner er gyldige
+    """
+    if not isinstance(spillerposisjoner, dict):
+        logger.error("FEIL: Ugyldig spillerposisjoner format: %r", spillerposisjoner)
+        return False
+
+    # Sjekk at alle spillere har gyldige posisjoner
+    logger.debug("Validerer spillerposisjoner...")
+    for spiller_id, posisjon in spillerposisjoner.items():
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Validerer spiller %s: %s",
+                spiller_id,
+                json.dumps(posisjon, indent=2),
+            )
+
+        if not isinstance(posisjon, dict):
+            logger.error(
+                "FEIL: Ugyldig posisjonsformat for spiller %s: %s",
+                spiller_id,
+                posisjon,
+            )
+            return False
+
+        x = posisjon.get("x")
+        y = posisjon.get("y")
+
+        if x is None or y is None:
+            logger.error(
+                "FEIL: Mangler x/y koordinater for spiller %s: %s",
+                spiller_id,
+                posisjon,
+            )
+            return False
+
+        try:
+            x_float = float(x)
+            y_float = float(y)
+            logger.debug(
+                "Koordinater for spiller %s: x=%f, y=%f",
+                spiller_id,
+                x_float,
+                y_float,
+            )
+
+            if not (0 <= x_float <= 100 and 0 <= y_float <= 100):
+                logger.error(
+                    "FEIL: Koordinater utenfor gyldig område (0-100) "
+                    "for spiller %s: x=%f, y=%f",
+                    spiller_id,
+                    x_float,
+                    y_float,
+                )
+                return False
+        except ValueError as e:
+            logger.error(
+                "FEIL: Kunne ikke konvertere koordinater til float "
+                "for spiller %s: %s",
+                spiller_id,
+                str(e),
+            )
+            return False
+
+    logger.debug("Alle spillerposisjoner validert OK")
+    return True
+
+
 def lagre_banekart(
     app_handler: AppHandler, kamp_id: int, periode_id: int, spillerposisjoner: dict
 ) -> bool:
     """Lagrer banekart med spillerposisjoner for en gitt kamp og periode."""
-    logger.debug("=== START LAGRE BANEKART ===")
-    logger.debug("Input parametre:")
-    logger.debug("- kamp_id: %s (type: %s)", kamp_id, type(kamp_id))
-    logger.debug("- periode_id: %s (type: %s)", periode_id, type(periode_id))
-    logger.debug("- spillerposisjoner: %s", json.dumps(spillerposisjoner, indent=2))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "=== START LAGRE BANEKART === kamp_id=%r, periode_id=%r, "
+            "spillerposisjoner=%s",
+            kamp_id,
+            periode_id,
+            json.dumps(spillerposisjoner, indent=2),
+        )
+
+    # Valider før tilkoblingen åpnes, så ingen lås holdes under valideringen
+    if not valider_spillerposisjoner(spillerposisjoner):
+        logger.debug("=== SLUTT LAGRE BANEKART (FEILET) ===")
+        return False
 
     try:
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
             logger.debug("Database tilkobling opprettet")
 
             # Start transaksjon
-            cursor.execute("BEGIN TRANSACTION")
+            cursor.execute("BEGIN IMMEDIATE")
             logger.debug("Transaksjon startet")
 
             try:
@@ -1932,106 +2253,16 @@ def lagre_banekart(
                     return False
                 logger.debug("Kamp funnet: %s", kamp)
 
-                # Valider spillerposisjoner
-                if not isinstance(spillerposisjoner, dict):
-                    logger.error(
-                        "FEIL: Ugyldig spillerposisjoner format: %s (type: %s)",
-                        spillerposisjoner,
-                        type(spillerposisjoner),
-                    )
-                    conn.rollback()
-                    return False
-
-                # Sjekk at alle spillere har gyldige posisjoner
-                logger.debug("Validerer spillerposisjoner...")
-                for spiller_id, posisjon in spillerposisjoner.items():
-                    logger.debug(
-                        "Validerer spiller %s: %s",
-                        spiller_id,
-                        json.dumps(posisjon, indent=2),
-                    )
-
-                    if not isinstance(posisjon, dict):
-                        logger.error(
-                            "FEIL: Ugyldig posisjonsformat for spiller %s: %s",
-                            spiller_id,
-                            posisjon,
-                        )
-                        conn.rollback()
-                        return False
-
-                    x = posisjon.get("x")
-                    y = posisjon.get("y")
-
-                    if x is None or y is None:
-                        logger.error(
-                            "FEIL: Mangler x/y koordinater for spiller %s: %s",
-                            spiller_id,
-                            posisjon,
-                        )
-                        conn.rollback()
-                        return False
-
-                    try:
-                        x_float = float(x)
-                        y_float = float(y)
-                        logger.debug(
-                            "Koordinater for spiller %s: x=%f, y=%f",
-                            spiller_id,
-                            x_float,
-                            y_float,
-                        )
-
-                        if not (0 <= x_float <= 100 and 0 <= y_float <= 100):
-                            logger.error(
-                                "FEIL: Koordinater utenfor gyldig område (0-100) "
-                                "for spiller %s: x=%f, y=%f",
-                                spiller_id,
-                                x_float,
-                                y_float,
-                            )
-                            conn.rollback()
-                            return False
-                    except ValueError as e:
-                        logger.error(
-                            "FEIL: Kunne ikke konvertere koordinater til float "
-                            "for spiller %s: %s",
-                            spiller_id,
-                            str(e),
-                        )
-                        conn.rollback()
-                        return False
-
-                logger.debug("Alle spillerposisjoner validert OK")
-
-                # Slett eventuelle eksisterende posisjoner
-                logger.debug("Sletter eksisterende posisjoner...")
-                cursor.execute(
-                    """DELETE FROM banekart
-                    WHERE kamp_id = ? AND periode_id =?""",
-                    (kamp_id, periode_id),
-                )
-                logger.debug(
-                    "Eksisterende posisjoner slettet. " "Antall rader påvirket: %d",
-                    cursor.rowcount,
-                )
-
-                # Lagre nye posisjoner
-                logger.debug("Lagrer nye posisjoner...")
-                spillerposisjoner_json = json.dumps(spillerposisjoner)
+                # Lagre eller oppdater posisjoner
+                logger.debug("Lagrer posisjoner...")
+                spillerposisjoner_json = _dumps_posisjoner(spillerposisjoner)
                 logger.debug("JSON som skal lagres: %s", spillerposisjoner_json)
 
                 cursor.execute(
-                    """INSERT INTO banekart (
-                        kamp_id,
-                        periode_id,
-                        spillerposisjoner,
-                        opprettet_dato,
-                        sist_oppdatert
-                    ) VALUES (?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)""",
+                    _SQL_UPSERT_BANEKART,
                     (kamp_id, periode_id, spillerposisjoner_json),
                 )
-                logger.debug("SQL INSERT utført")
+                logger.debug("SQL UPSERT utført")
 
                 # Verifiser at dataene ble lagret
                 cursor.execute(
@@ -2086,13 +2317,12 @@ def hent_banekart(
         Optional[Dict[str, Dict[str, float]]]: Spillerposisjoner hvis funnet,
         ellers None
     """
-    logger.debug("=== Start hent_banekart ===")
-    logger.debug("Input parametre:")
-    logger.debug("- kamp_id: %s (type: %s)", kamp_id, type(kamp_id))
-    logger.debug("- periode_id: %s (type: %s)", periode_id, type(periode_id))
+    logger.debug(
+        "=== Start hent_banekart === kamp_id=%r, periode_id=%r", kamp_id, periode_id
+    )
 
     try:
-        with app_handler._database_handler.connection() as conn:
+        with app_handler.db_handler.connection() as conn:
             cursor = conn.cursor()
             logger.debug("Database tilkobling opprettet")
 
@@ -2106,17 +2336,17 @@ def hent_banekart(
 
             row = cursor.fetchone()
             if not row:
-                msg = (
-                    f"Ingen banekart funnet for kamp {kamp_id}, "
-                    f"periode {periode_id}"
+                logger.info(
+                    "Ingen banekart funnet for kamp %s, periode %s",
+                    kamp_id,
+                    periode_id,
                 )
-                logger.info(msg)
                 logger.debug("=== Slutt hent_banekart (ingen data) ===")
                 return None
 
-            posisjoner = json.loads(row[0])
-            pos_str = json.dumps(posisjoner, indent=2)
-            logger.debug("Hentet posisjoner: %s", pos_str)
+            posisjoner = _loads_posisjoner(row[0])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Hentet posisjoner: %s", json.dumps(posisjoner, indent=2))
             logger.debug("=== Slutt hent_banekart (suksess) ===")
             return posisjoner
 
@@ -2126,3 +2356,39 @@ def hent_banekart(
         logger.exception("Full feilmelding:")
         logger.debug("=== Slutt hent_banekart (feilet) ===")
         return None
+
+
+def hent_alle_banekart(
+    app_handler: AppHandler, kamp_id: int
+) -> Dict[int, Dict[str, Dict[str, float]]]:
+    """Henter lagrede banekart for alle perioder i en kamp med én spørring.
+
+    Args:
+        app_handler: AppHandler instans
+        kamp_id: ID for kampen
+
+    Returns:
+        Dict[int, Dict[str, Dict[str, float]]]: Spillerposisjoner per periode_id
+    """
+    logger.debug("Henter alle banekart for kamp %s", kamp_id)
+
+    try:
+        with app_handler.db_handler.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT periode_id, spillerposisjoner
+                FROM banekart
+                WHERE kamp_id = ?""",
+                (kamp_id,),
+            )
+
+            alle_banekart = {row[0]: _loads_posisjoner(row[1]) for row in cursor}
+            logger.debug(
+                "Fant banekart for %d perioder i kamp %s", len(alle_banekart), kamp_id
+            )
+            return alle_banekart
+
+    except Exception as e:
+        logger.error("Feil ved henting av banekart: %s", str(e))
+        logger.exception("Full feilmelding:")
+        return {}
@@ -12,6 +12,15 @@ from min_kamp.db.handlers.app_handler import AppHandler
 
 logger = logging.getLogger(__name__)
 
+# Fast bredde på knappene i posisjonslisten
+_KNAPP_CSS = """
+<style>
+.stButton > button {
+    width: 150px;
+}
+</style>
+"""
+
 
 def vis_oppsett_side(app_handler: AppHandler) -> None:
     """Rendrer oppsett-siden.
@@ -167,16 +176,7 @@ def vis_oppsett_side(app_handler: AppHandler) -> None:
         st.header("Endre spillerposisjoner")
 
         # Legg til CSS for knapper
-        st.markdown(
-            """
-            <style>
-            .stButton > button {
-                width: 150px;
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
+        st.markdown(_KNAPP_CSS, unsafe_allow_html=True)
 
         # Hent alle spillere
         spillere = app_handler.spiller_handler.hent_spillere(bruker_id)
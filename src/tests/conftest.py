@@ -0,0 +1,42 @@
+"""
+Felles fixtures for testene.
+"""
+
+import os
+from typing import Dict
+
+import pytest
+from min_kamp.db.db_handler import DatabaseHandler
+from min_kamp.db.migrations.migrations_handler import kjor_migrasjoner
+
+MIGRASJONER_MAPPE = os.path.join(
+    os.path.dirname(__file__), "..", "min_kamp", "db", "migrations"
+)
+
+
+@pytest.fixture
+def db_handler(tmp_path) -> DatabaseHandler:
+    """DatabaseHandler mot en ny database med alle migrasjoner kjørt."""
+    handler = DatabaseHandler(database_path=str(tmp_path / "kampdata.db"))
+    kjor_migrasjoner(handler, MIGRASJONER_MAPPE)
+    return handler
+
+
+@pytest.fixture
+def kamp(db_handler: DatabaseHandler) -> Dict[str, int]:
+    """Oppretter en bruker og en kamp, og returnerer id-ene."""
+    with db_handler.connection() as conn:
+        bruker_id = conn.execute(
+            """
+            INSERT INTO brukere (brukernavn, passord_hash, salt)
+            VALUES ('trener', 'hash', 'salt')
+            """
+        ).lastrowid
+        kamp_id = conn.execute(
+            """
+            INSERT INTO kamper (bruker_id, motstander, dato, hjemmebane)
+            VALUES (?, 'Motstander', '2024-05-01', 1)
+            """,
+            (bruker_id,),
+        ).lastrowid
+    return {"bruker_id": bruker_id, "kamp_id": kamp_id}
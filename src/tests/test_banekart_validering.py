@@ -0,0 +1,97 @@
+"""
+Tester for valideringen av banekart i migrasjon 005 og indeksen som fjernes i 006.
+"""
+
+import json
+import sqlite3
+from typing import Dict
+
+import pytest
+from min_kamp.db.db_handler import DatabaseHandler
+
+_SQL_LAGRE = """
+    INSERT INTO banekart (kamp_id, periode_id, spillerposisjoner)
+    VALUES (?, 0, ?)
+"""
+
+
+def _lagre(db_handler: DatabaseHandler, kamp_id: int, posisjoner: str) -> None:
+    with db_handler.connection() as conn:
+        conn.execute(_SQL_LAGRE, (kamp_id, posisjoner))
+
+
+def test_gyldige_posisjoner_lagres(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    posisjoner = json.dumps({"1": {"x": 0, "y": 100}, "2": {"x": 50.5, "y": 25}})
+    _lagre(db_handler, kamp["kamp_id"], posisjoner)
+
+    with db_handler.connection(readonly=True) as conn:
+        (lagret,) = conn.execute("SELECT spillerposisjoner FROM banekart").fetchone()
+    assert json.loads(lagret) == json.loads(posisjoner)
+
+
+@pytest.mark.parametrize("posisjoner", ["ikke json", "{", ""])
+def test_ugyldig_json_avvises(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], posisjoner: str
+) -> None:
+    with pytest.raises(sqlite3.IntegrityError, match="gyldig JSON"):
+        _lagre(db_handler, kamp["kamp_id"], posisjoner)
+
+
+@pytest.mark.parametrize(
+    "posisjon",
+    [
+        {"x": -1, "y": 50},
+        {"x": 50, "y": 100.5},
+        {"x": 101, "y": 101},
+        {"x": 50},
+        {"y": 50},
+    ],
+)
+def test_koordinater_utenfor_banen_avvises(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], posisjon: Dict[str, float]
+) -> None:
+    with pytest.raises(sqlite3.IntegrityError, match="mellom 0 og 100"):
+        _lagre(db_handler, kamp["kamp_id"], json.dumps({"1": posisjon}))
+
+
+def test_ugyldig_oppdatering_avvises(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    _lagre(db_handler, kamp["kamp_id"], json.dumps({"1": {"x": 10, "y": 10}}))
+
+    with pytest.raises(sqlite3.IntegrityError, match="mellom 0 og 100"):
+        with db_handler.connection() as conn:
+            conn.execute(
+                "UPDATE banekart SET spillerposisjoner = ?",
+                (json.dumps({"1": {"x": 10, "y": 200}}),),
+            )
+    with pytest.raises(sqlite3.IntegrityError, match="gyldig JSON"):
+        with db_handler.connection() as conn:
+            conn.execute("UPDATE banekart SET spillerposisjoner = 'ikke json'")
+
+    with db_handler.connection(readonly=True) as conn:
+        (lagret,) = conn.execute("SELECT spillerposisjoner FROM banekart").fetchone()
+    assert json.loads(lagret) == {"1": {"x": 10, "y": 10}}
+
+
+def test_banekart_slas_opp_med_primaernokkelen(db_handler: DatabaseHandler) -> None:
+    with db_handler.connection(readonly=True) as conn:
+        indekser = {
+            navn
+            for (navn,) in conn.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = 'banekart'"
+            )
+        }
+        plan = " ".join(
+            str(rad[3])
+            for rad in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT spillerposisjoner FROM banekart "
+                "WHERE kamp_id = 1 AND periode_id = 0"
+            )
+        )
+
+    assert "idx_banekart_kamp_periode" not in indekser
+    assert "sqlite_autoindex_banekart_1" in plan
@@ -0,0 +1,133 @@
+"""
+Tester for hurtigbufrene i cache_utils og at skriverne tømmer dem.
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+
+import pytest
+from min_kamp.db.db_handler import DatabaseHandler
+from min_kamp.db.handlers.app_handler import AppHandler
+from min_kamp.db.handlers.bytteplan_handler import BytteplanHandler
+from min_kamp.db.utils.cache_utils import (
+    hent_bytteplanperioder_cached,
+    hent_kampinnstillinger_cached,
+    invalidate_bytteplan_cache,
+    invalidate_kamp_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def tomme_buffere() -> Iterator[None]:
+    """Bufrene deles i prosessen, så hver test starter og slutter tom."""
+    invalidate_kamp_cache()
+    invalidate_bytteplan_cache()
+    yield
+    invalidate_kamp_cache()
+    invalidate_bytteplan_cache()
+
+
+def _innstillinger(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> Tuple[int, int, int]:
+    return hent_kampinnstillinger_cached(
+        db_handler, db_handler.database_path, kamp["kamp_id"], kamp["bruker_id"]
+    )
+
+
+def _lagre_direkte(
+    db_handler: DatabaseHandler,
+    nokkel: str,
+    verdi: str,
+    bruker_id: int,
+    kamp_id: Optional[int] = None,
+) -> None:
+    """Skriver utenom handlerne, slik at bufferen ikke tømmes."""
+    with db_handler.connection() as conn:
+        conn.execute(
+            """
+            INSERT INTO app_innstillinger (bruker_id, kamp_id, nokkel, verdi)
+            VALUES (?, ?, ?, ?)
+            """,
+            (bruker_id, kamp_id, nokkel, verdi),
+        )
+
+
+def test_standardverdier_uten_innstillinger(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    assert _innstillinger(db_handler, kamp) == (70, 7, 7)
+
+
+@pytest.mark.parametrize("verdi", ["abc", "", "7x", "-5", "1.5"])
+def test_ugyldige_verdier_gir_standardverdi(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], verdi: str
+) -> None:
+    _lagre_direkte(db_handler, "kamplengde", verdi, kamp["bruker_id"])
+
+    assert _innstillinger(db_handler, kamp) == (70, 7, 7)
+
+
+def test_kampverdi_gaar_foran_brukerverdi(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    _lagre_direkte(db_handler, "kamplengde", "50", kamp["bruker_id"])
+    _lagre_direkte(db_handler, "kamplengde", " 60 ", kamp["bruker_id"], kamp["kamp_id"])
+    _lagre_direkte(db_handler, "antall_perioder", "0", kamp["bruker_id"])
+
+    assert _innstillinger(db_handler, kamp) == (60, 0, 7)
+
+
+def test_innstillinger_leses_paa_nytt_etter_invalidering(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    assert _innstillinger(db_handler, kamp) == (70, 7, 7)
+
+    _lagre_direkte(db_handler, "kamplengde", "60", kamp["bruker_id"])
+    assert _innstillinger(db_handler, kamp) == (70, 7, 7)
+
+    invalidate_kamp_cache()
+    assert _innstillinger(db_handler, kamp) == (60, 7, 7)
+
+
+def test_app_handler_tommer_innstillingsbufferen(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    app_handler = AppHandler(db_handler)
+    assert _innstillinger(db_handler, kamp) == (70, 7, 7)
+
+    app_handler.lagre_innstilling("antall_paa_banen", "9", kamp["bruker_id"])
+    assert _innstillinger(db_handler, kamp) == (70, 7, 9)
+
+    app_handler.slett_innstilling("antall_paa_banen", kamp["bruker_id"])
+    assert _innstillinger(db_handler, kamp) == (70, 7, 7)
+
+
+def test_bytteplan_handler_tommer_periodebufferen(
+    db_handler: DatabaseHandler, kamp: Dict[str, int]
+) -> None:
+    with db_handler.connection() as conn:
+        spiller_id = conn.execute(
+            """
+            INSERT INTO spillere (bruker_id, navn, posisjon)
+            VALUES (?, 'A', 'Midtbane')
+            """,
+            (kamp["bruker_id"],),
+        ).lastrowid
+    perioder = hent_bytteplanperioder_cached(
+        db_handler, db_handler.database_path, kamp["kamp_id"]
+    )
+    assert perioder == []
+
+    BytteplanHandler(db_handler).lagre_bytteplan(
+        {
+            "kamp_id": kamp["kamp_id"],
+            "spiller_id": spiller_id,
+            "periode": 2,
+            "er_paa": True,
+        }
+    )
+    perioder = hent_bytteplanperioder_cached(
+        db_handler, db_handler.database_path, kamp["kamp_id"]
+    )
+    assert [p["id"] for p in perioder] == [2]
+    assert perioder[0]["beskrivelse"] == "Periode 3"
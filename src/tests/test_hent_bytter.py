@@ -0,0 +1,156 @@
+"""
+Tester for hent_bytter_for_periode og paringen i _SQL_HENT_BYTTER.
+
+Spørringen skal gi samme bytter som den opprinnelige Python-løkken: statusendringer
+sorteres på tid og pares to og to, og et par blir et bytte bare når det har
+én spiller ut og én inn.
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+from min_kamp.db.db_handler import DatabaseHandler
+from min_kamp.db.handlers.app_handler import AppHandler
+from min_kamp.pages.formation_page import Bytte, hent_bytter_for_periode
+
+# (spiller, er_paa) i tidsrekkefølge
+Hendelse = Tuple[str, int]
+
+
+@pytest.fixture
+def spillere(db_handler: DatabaseHandler, kamp: Dict[str, int]) -> Dict[str, int]:
+    """Oppretter spillerne A-F og returnerer navn -> id."""
+    ids = {}
+    with db_handler.connection() as conn:
+        for navn in "ABCDEF":
+            ids[navn] = conn.execute(
+                """
+                INSERT INTO spillere (bruker_id, navn, posisjon)
+                VALUES (?, ?, 'Midtbane')
+                """,
+                (kamp["bruker_id"], navn),
+            ).lastrowid
+    return ids
+
+
+def _tid(i: int) -> str:
+    return f"2024-05-01 18:{i // 60:02d}:{i % 60:02d}"
+
+
+def _lagre_hendelser(
+    db_handler: DatabaseHandler,
+    kamp_id: int,
+    spillere: Dict[str, int],
+    hendelser: List[Hendelse],
+    periode: int = 0,
+) -> None:
+    with db_handler.connection() as conn:
+        conn.executemany(
+            """
+            INSERT INTO bytteplan (kamp_id, spiller_id, periode, er_paa, sist_oppdatert)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (kamp_id, spillere[navn], periode, er_paa, _tid(i))
+                for i, (navn, er_paa) in enumerate(hendelser)
+            ],
+        )
+
+
+def _forventede_bytter(hendelser: List[Hendelse]) -> List[Bytte]:
+    """Den opprinnelige Python-paringen, brukt som fasit."""
+    forrige: Dict[str, int] = {}
+    endringer = []
+    for i, (navn, er_paa) in enumerate(hendelser):
+        if forrige.get(navn) != er_paa:
+            endringer.append((navn, er_paa, _tid(i)))
+        forrige[navn] = er_paa
+
+    bytter = []
+    for i in range(0, len(endringer) - 1, 2):
+        ut: Optional[str] = None
+        inn: Optional[str] = None
+        for navn, er_paa, _ in endringer[i : i + 2]:
+            if er_paa:
+                inn = navn
+            else:
+                ut = navn
+        if ut and inn:
+            bytter.append(Bytte(ut, inn, endringer[i][2]))
+    return bytter
+
+
+def _hent(db_handler: DatabaseHandler, kamp_id: int, periode: int = 0) -> List[Bytte]:
+    return hent_bytter_for_periode(AppHandler(db_handler), kamp_id, periode)
+
+
+def test_ut_og_inn_pares(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], spillere: Dict[str, int]
+) -> None:
+    hendelser = [("A", 0), ("B", 1), ("C", 1), ("D", 0)]
+    _lagre_hendelser(db_handler, kamp["kamp_id"], spillere, hendelser)
+
+    assert _hent(db_handler, kamp["kamp_id"]) == [
+        Bytte("A", "B", _tid(0)),
+        Bytte("D", "C", _tid(2)),
+    ]
+
+
+def test_uparet_siste_endring_ignoreres(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], spillere: Dict[str, int]
+) -> None:
+    hendelser = [("A", 0), ("B", 1), ("C", 0)]
+    _lagre_hendelser(db_handler, kamp["kamp_id"], spillere, hendelser)
+
+    assert _hent(db_handler, kamp["kamp_id"]) == [Bytte("A", "B", _tid(0))]
+
+
+def test_gjentatt_status_er_ikke_en_endring(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], spillere: Dict[str, int]
+) -> None:
+    # A lagres som ute to ganger; den andre raden skal ikke pares med B
+    hendelser = [("A", 0), ("A", 0), ("B", 1), ("C", 1), ("C", 1), ("D", 0)]
+    _lagre_hendelser(db_handler, kamp["kamp_id"], spillere, hendelser)
+
+    assert _hent(db_handler, kamp["kamp_id"]) == [
+        Bytte("A", "B", _tid(0)),
+        Bytte("D", "C", _tid(3)),
+    ]
+
+
+def test_to_ut_gir_ikke_bytte(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], spillere: Dict[str, int]
+) -> None:
+    hendelser = [("A", 0), ("B", 0), ("C", 1), ("D", 0)]
+    _lagre_hendelser(db_handler, kamp["kamp_id"], spillere, hendelser)
+
+    assert _hent(db_handler, kamp["kamp_id"]) == [Bytte("D", "C", _tid(2))]
+
+
+def test_andre_perioder_tas_ikke_med(
+    db_handler: DatabaseHandler, kamp: Dict[str, int], spillere: Dict[str, int]
+) -> None:
+    _lagre_hendelser(
+        db_handler, kamp["kamp_id"], spillere, [("A", 0), ("B", 1)], periode=1
+    )
+
+    assert _hent(db_handler, kamp["kamp_id"], periode=0) == []
+    assert _hent(db_handler, kamp["kamp_id"], periode=1) == [Bytte("A", "B", _tid(0))]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_samme_bytter_som_python_paringen(
+    db_handler: DatabaseHandler,
+    kamp: Dict[str, int],
+    spillere: Dict[str, int],
+    seed: int,
+) -> None:
+    tilfeldig = random.Random(seed)
+    hendelser = [
+        (tilfeldig.choice("ABCDEF"), tilfeldig.randint(0, 1))
+        for _ in range(tilfeldig.randint(0, 40))
+    ]
+    _lagre_hendelser(db_handler, kamp["kamp_id"], spillere, hendelser)
+
+    assert _hent(db_handler, kamp["kamp_id"]) == _forventede_bytter(hendelser)